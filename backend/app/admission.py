@@ -0,0 +1,240 @@
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+from fastapi import HTTPException, Request, status
+from app.instrumentation import route_template
+
+logger = logging.getLogger(__name__)
+
+# Admission control in two layers: token buckets per client (IP or account)
+# on the expensive public endpoints, answering 429, and a cap on in-flight
+# requests per route, answering 503. Both send Retry-After, so a burst is
+# shed up front instead of queueing behind bcrypt or the connection pool.
+
+class Rate:
+    """`capacity` requests of burst, refilled evenly over `period` seconds."""
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.per_second = capacity / period
+
+def parse_rate(value: str) -> Optional[Rate]:
+    # "30/60" is 30 requests per 60 seconds; empty or "0" turns the limit off
+    if not value or value == "0":
+        return None
+    capacity, _, period = value.partition("/")
+    return Rate(float(capacity), float(period or 1))
+
+AUTH_IP_RATE = parse_rate(os.getenv("RATE_LIMIT_AUTH_IP", "30/60"))
+LOGIN_ACCOUNT_RATE = parse_rate(os.getenv("RATE_LIMIT_LOGIN_ACCOUNT", "10/300"))
+SEARCH_IP_RATE = parse_rate(os.getenv("RATE_LIMIT_SEARCH_IP", "120/60"))
+# memory: per worker; sqlite: one bucket table shared by every worker on the host
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv(
+    "RATE_LIMIT_SQLITE_PATH", "/tmp/ratelimit.db" if os.getenv("VERCEL") else "./ratelimit.db"
+)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Behind a proxy (Vercel, a load balancer) the client address comes from X-Forwarded-For.
+# Clients can send their own entries, so only the last TRUSTED_PROXY_HOPS entries,
+# appended by our own proxies, are believed: the client is the leftmost of those.
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "1" if os.getenv("VERCEL") else "0") == "1"
+TRUSTED_PROXY_HOPS = max(int(os.getenv("TRUSTED_PROXY_HOPS", "1")), 1)
+
+# In-flight requests allowed per route ("METHOD /template"); 0 means no cap
+ROUTE_MAX_CONCURRENCY = int(os.getenv("ROUTE_MAX_CONCURRENCY", "64"))
+ROUTE_CONCURRENCY_LIMITS: Dict[str, int] = {
+    route.strip(): int(limit)
+    for route, _, limit in (
+        item.rpartition("=")
+        for item in os.getenv("ROUTE_CONCURRENCY_LIMITS", "POST /auth/login=16,POST /auth/register=16,GET /providers/=32").split(",")
+        if item.strip()
+    )
+}
+
+class MemoryBuckets:
+    """Token buckets in a bounded LRU; an evicted key simply starts full again."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: Rate) -> float:
+        # Returns 0 when a token was taken, else seconds until one is available
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rate.capacity, now))
+            tokens = min(rate.capacity, tokens + (now - updated) * rate.per_second)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate.per_second
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def peek(self, key: str, rate: Rate) -> float:
+        # Like take, without taking the token
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rate.capacity, now))
+        tokens = min(rate.capacity, tokens + (now - updated) * rate.per_second)
+        return 0.0 if tokens >= 1 else (1 - tokens) / rate.per_second
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file, so every worker process draws from the same bucket.
+    Each take is one atomic upsert."""
+
+    # Every this many takes, rows idle for an hour (full again, for any sane
+    # refill period) are pruned
+    PRUNE_EVERY = 10000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # Losing buckets on power loss is harmless
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate: Rate) -> float:
+        conn = self._connect()
+        now = time.time()
+        refilled = "min(:capacity, tokens + (:now - updated) * :per_second)"
+        params = {"key": key, "capacity": rate.capacity, "per_second": rate.per_second, "now": now}
+        taken = conn.execute(
+            f"""INSERT INTO rate_bucket (key, tokens, updated) VALUES (:key, :capacity - 1, :now)
+                ON CONFLICT (key) DO UPDATE SET tokens = {refilled} - 1, updated = :now
+                WHERE {refilled} >= 1
+                RETURNING tokens""",
+            params,
+        ).fetchone()
+        self._takes += 1
+        if self._takes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM rate_bucket WHERE updated < :cutoff", {"cutoff": now - 3600})
+        if taken is not None:
+            return 0.0
+        tokens = conn.execute(f"SELECT {refilled} FROM rate_bucket WHERE key = :key", params).fetchone()[0]
+        return (1 - tokens) / rate.per_second
+
+    def peek(self, key: str, rate: Rate) -> float:
+        refilled = "min(:capacity, tokens + (:now - updated) * :per_second)"
+        row = self._connect().execute(
+            f"SELECT {refilled} FROM rate_bucket WHERE key = :key",
+            {"key": key, "capacity": rate.capacity, "per_second": rate.per_second, "now": time.time()},
+        ).fetchone()
+        if row is None or row[0] >= 1:
+            return 0.0
+        return (1 - row[0]) / rate.per_second
+
+class RateLimiter:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.rejected: Counter = Counter()  # (limit, keyed by) -> requests
+
+    def check(self, limit: str, keyed_by: str, key: str, rate: Optional[Rate]):
+        """Takes a token for this request, or raises 429."""
+        if rate is None:
+            return
+        self._reject(limit, keyed_by, self.buckets.take(f"{limit}:{keyed_by}:{key}", rate))
+
+    def require(self, limit: str, keyed_by: str, key: str, rate: Optional[Rate]):
+        """Raises 429 while the bucket is empty, without taking a token; pair with `charge`."""
+        if rate is None:
+            return
+        self._reject(limit, keyed_by, self.buckets.peek(f"{limit}:{keyed_by}:{key}", rate))
+
+    def charge(self, limit: str, keyed_by: str, key: str, rate: Optional[Rate]):
+        """Takes a token if one is left, e.g. after a failed attempt."""
+        if rate is not None:
+            self.buckets.take(f"{limit}:{keyed_by}:{key}", rate)
+
+    def _reject(self, limit: str, keyed_by: str, wait: float):
+        if wait:
+            self.rejected[(limit, keyed_by)] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please retry later",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+def _buckets():
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBuckets(RATE_LIMIT_SQLITE_PATH)
+    if RATE_LIMIT_BACKEND != "memory":
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND {RATE_LIMIT_BACKEND!r}, using memory")
+    return MemoryBuckets(RATE_LIMIT_MAX_KEYS)
+
+limiter = RateLimiter(_buckets())
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if hops:
+            return hops[-min(TRUSTED_PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else ""
+
+def limit_by_ip(limit: str, rate: Optional[Rate]):
+    """Route dependency drawing one token per request from the client's bucket.
+    Sync, so FastAPI runs it in the threadpool and a shared SQLite bucket never blocks the loop."""
+    def dependency(request: Request):
+        limiter.check(limit, "ip", client_ip(request), rate)
+    return dependency
+
+# Per-route in-flight counts and sheds; only touched from the event loop
+in_flight: Counter = Counter()
+shed_requests: Counter = Counter()
+
+class ConcurrencyLimitMiddleware:
+    """Answers 503 with Retry-After when a route already has its cap of requests in flight."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = f"{scope['method']} {route_template(scope)}"
+        cap = ROUTE_CONCURRENCY_LIMITS.get(route, ROUTE_MAX_CONCURRENCY)
+        if cap and in_flight[route] >= cap:
+            shed_requests[route] += 1
+            body = json.dumps({"detail": "Server busy, please retry"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": status.HTTP_503_SERVICE_UNAVAILABLE,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        in_flight[route] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            in_flight[route] -= 1
+
+def admission_stats():
+    return {
+        "backend": type(limiter.buckets).__name__,
+        "rate_limited": {f"{limit}/{keyed_by}": n for (limit, keyed_by), n in limiter.rejected.items()},
+        "shed": dict(shed_requests),
+        "in_flight": {route: n for route, n in in_flight.items() if n},
+    }
@@ -1,29 +1,43 @@
 import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
-from app.database import get_session
+from sqlalchemy import event, inspect
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.cache import TTLCache
+from app.database import get_async_session
 from app.models import User, UserRole
+from app.passwords import (
+    verify_password, verify_and_update_password, get_password_hash,
+    averify_and_update_password, aget_password_hash,
+)
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-it-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 day
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Resolved principals keyed by token subject (email). The token itself is
+# still decoded and expiry-checked on every request.
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60")),
+)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_principal(mapper, connection, target):
+    principal_cache.pop(target.email)
+    # Also drop the entry under the old address if the email itself changed
+    for old_email in inspect(target).attrs.email.history.deleted:
+        principal_cache.pop(old_email)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt  # Imported on first use to keep cold starts fast
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -33,12 +47,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_async_session)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -47,9 +62,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
     except JWTError:
         raise credentials_exception
 
-    user = session.exec(select(User).where(User.email == email)).first()
+    user = principal_cache.get(email)
     if user is None:
-        raise credentials_exception
+        user = (await session.exec(select(User).where(User.email == email))).first()
+        if user is None:
+            raise credentials_exception
+        # Cache a detached copy so it is never tied to this request's session
+        user = User(**user.model_dump())
+        principal_cache.set(email, user)
     return user
 
 def get_current_admin(current_user: User = Depends(get_current_user)):
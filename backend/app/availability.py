@@ -0,0 +1,147 @@
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from fastapi import HTTPException
+from sqlmodel import Session, select, update
+from app.models import Booking, BookingStatus, ServiceProvider
+
+# Working hours and naive booking times are interpreted in this zone
+SERVICE_TIMEZONE = ZoneInfo(os.getenv("SERVICE_TIMEZONE", "Asia/Kolkata"))
+
+MIN_BOOKING_MINUTES = 15
+MAX_BOOKING_MINUTES = 8 * 60
+MAX_AVAILABILITY_DAYS = 31
+
+Interval = Tuple[datetime, datetime]
+
+def to_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=SERVICE_TIMEZONE)
+    return value.astimezone(timezone.utc)
+
+def working_days(provider: ServiceProvider) -> set:
+    return {int(d) for d in provider.working_days.split(",") if d.strip()}
+
+def working_window(provider: ServiceProvider, day: date) -> Optional[Interval]:
+    # The provider's hours on a local calendar day, in UTC; None on days off
+    if day.weekday() not in working_days(provider):
+        return None
+    start = datetime.combine(day, provider.work_start, tzinfo=SERVICE_TIMEZONE)
+    end = datetime.combine(day, provider.work_end, tzinfo=SERVICE_TIMEZONE)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+def within_working_hours(provider: ServiceProvider, start: datetime, end: datetime) -> bool:
+    window = working_window(provider, start.astimezone(SERVICE_TIMEZONE).date())
+    return window is not None and window[0] <= start and end <= window[1]
+
+def lock_provider_schedule(session: Session, provider_id: int):
+    # A no-op write on the provider row serializes bookings for that provider
+    # until commit: a row lock on Postgres, the database write lock on SQLite.
+    # It must run before the conflict check reads.
+    session.exec(update(ServiceProvider).where(ServiceProvider.id == provider_id).values(id=ServiceProvider.id))
+
+def find_conflict(session: Session, provider_id: int, start: datetime, end: datetime) -> Optional[Booking]:
+    # Any active booking overlapping [start, end). No booking is longer than
+    # MAX_BOOKING_MINUTES, so the scan is a bounded range of
+    # ix_booking_provider_status_date_time, whatever overlaps already exist.
+    return session.exec(
+        select(Booking)
+        .where(
+            Booking.provider_id == provider_id,
+            Booking.status == BookingStatus.PENDING,
+            Booking.date_time >= start - timedelta(minutes=MAX_BOOKING_MINUTES),
+            Booking.date_time < end,
+            Booking.end_time > start,
+        )
+        .order_by(Booking.date_time)
+        .limit(1)
+    ).first()
+
+def reserve_slot(session: Session, provider: ServiceProvider, start: datetime, end: datetime):
+    """Validates a new booking interval inside the caller's transaction; raises HTTP errors."""
+    if not within_working_hours(provider, start, end):
+        raise HTTPException(status_code=400, detail="Requested time is outside the provider's working hours")
+    lock_provider_schedule(session, provider.id)
+    if find_conflict(session, provider.id, start, end):
+        raise HTTPException(status_code=409, detail="Provider is already booked at that time")
+
+def reactivate_slot(session: Session, booking: Booking):
+    """Checks that an inactive booking can become active again, before its status changes."""
+    lock_provider_schedule(session, booking.provider_id)
+    if find_conflict(session, booking.provider_id, booking.date_time, booking.end_time):
+        raise HTTPException(status_code=409, detail="Provider is already booked at that time")
+
+def overlapping_bookings(session: Session) -> List[Tuple[int, int]]:
+    # (earlier, later) ids of active bookings of one provider that overlap; one
+    # ordered pass over ix_booking_provider_status_date_time. Left for an operator
+    # to resolve, since either booking may be the one the customer relies on.
+    rows = session.exec(
+        select(Booking.id, Booking.provider_id, Booking.date_time, Booking.end_time)
+        .where(Booking.status == BookingStatus.PENDING)
+        .order_by(Booking.provider_id, Booking.date_time, Booking.id)
+    )
+    pairs = []
+    provider_id, latest = None, None  # The booking ending last so far
+    for booking_id, booking_provider_id, start, end in rows:
+        if booking_provider_id != provider_id:
+            provider_id, latest = booking_provider_id, None
+        if latest is not None and start < latest[1]:
+            pairs.append((latest[0], booking_id))
+        if latest is None or end > latest[1]:
+            latest = (booking_id, end)
+    return pairs
+
+def busy_intervals(session: Session, provider_id: int, start: datetime, end: datetime) -> List[Interval]:
+    # Active bookings overlapping [start, end), read as a bounded index range
+    rows = session.exec(
+        select(Booking.date_time, Booking.end_time)
+        .where(
+            Booking.provider_id == provider_id,
+            Booking.status == BookingStatus.PENDING,
+            Booking.date_time >= start - timedelta(minutes=MAX_BOOKING_MINUTES),
+            Booking.date_time < end,
+        )
+        .order_by(Booking.date_time)
+    ).all()
+    return [(s, e) for s, e in rows if e > start]
+
+def free_slots(
+    provider: ServiceProvider,
+    busy: List[Interval],
+    first_day: date,
+    last_day: date,
+    duration: timedelta,
+    step: timedelta,
+    not_before: datetime,
+) -> List[Interval]:
+    slots = []
+    i = 0  # Sweep pointer into `busy`, which is sorted by start
+    day = first_day
+    while day <= last_day:
+        window = working_window(provider, day)
+        day += timedelta(days=1)
+        if window is None:
+            continue
+        slot_start = window[0]
+        while slot_start + duration <= window[1]:
+            slot_end = slot_start + duration
+            while i < len(busy) and busy[i][1] <= slot_start:
+                i += 1
+            if i < len(busy) and busy[i][0] < slot_end:
+                # Jump past the blocking booking, staying on the step grid
+                skip = busy[i][1] - slot_start
+                slot_start += step * -(-skip // step)
+                continue
+            if slot_start >= not_before:
+                slots.append((slot_start, slot_end))
+            slot_start += step
+    return slots
+
+if __name__ == "__main__":
+    from app.database import engine
+    with Session(engine) as session:
+        pairs = overlapping_bookings(session)
+    for earlier, later in pairs:
+        print(f"Pending booking {later} overlaps pending booking {earlier}")
+    print(f"{len(pairs)} overlapping pending booking pairs")
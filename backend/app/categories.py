@@ -0,0 +1,69 @@
+from typing import List
+from sqlmodel import Session, select, func, col
+from app.models import ServiceProvider, ServiceCategory, ProviderCategoryLink
+
+def parse_services(services: str) -> List[str]:
+    # "Plumber, electrician,Plumber" -> ["Plumber", "electrician"]
+    names = []
+    seen = set()
+    for part in services.split(","):
+        name = part.strip()
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+def get_or_create_categories(session: Session, names: List[str]) -> List[ServiceCategory]:
+    slugs = [name.lower() for name in names]
+    if not slugs:
+        return []
+    existing = session.exec(select(ServiceCategory).where(col(ServiceCategory.slug).in_(slugs))).all()
+    by_slug = {c.slug: c for c in existing}
+    for name, slug in zip(names, slugs):
+        if slug not in by_slug:
+            category = ServiceCategory(name=name, slug=slug)
+            session.add(category)
+            by_slug[slug] = category
+    session.flush()
+    return [by_slug[slug] for slug in slugs]
+
+def sync_provider_categories(session: Session, provider):
+    # Rewrites the provider's link rows from its `services` string; caller commits.
+    # `provider` only needs `id` and `services`, so a column row works too.
+    session.flush()
+    categories = get_or_create_categories(session, parse_services(provider.services))
+    current = set(session.exec(
+        select(ProviderCategoryLink.category_id).where(ProviderCategoryLink.provider_id == provider.id)
+    ).all())
+    wanted = {c.id for c in categories}
+    for category_id in current - wanted:
+        session.delete(session.get(ProviderCategoryLink, (provider.id, category_id)))
+    for category_id in wanted - current:
+        session.add(ProviderCategoryLink(provider_id=provider.id, category_id=category_id))
+
+def backfill_categories(session: Session) -> int:
+    # Links providers created before the category catalog existed. Selects
+    # columns rather than entities so it also runs mid-migration.
+    linked = select(ProviderCategoryLink.provider_id)
+    providers = session.exec(
+        select(ServiceProvider.id, ServiceProvider.services).where(col(ServiceProvider.id).not_in(linked))
+    ).all()
+    for provider in providers:
+        sync_provider_categories(session, provider)
+    session.commit()
+    return len(providers)
+
+def category_filter(names: List[str], match_all: bool = False):
+    # Subquery of provider ids linked to any (or all) of the given categories
+    slugs = list({name.strip().lower() for name in names if name.strip()})
+    statement = (
+        select(ProviderCategoryLink.provider_id)
+        .join(ServiceCategory, ServiceCategory.id == ProviderCategoryLink.category_id)
+        .where(col(ServiceCategory.slug).in_(slugs))
+    )
+    if match_all:
+        statement = (
+            statement.group_by(ProviderCategoryLink.provider_id)
+            .having(func.count(ProviderCategoryLink.category_id) == len(slugs))
+        )
+    return col(ServiceProvider.id).in_(statement)
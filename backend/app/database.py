@@ -1,9 +1,22 @@
+import logging
 import os
-from sqlmodel import create_engine, Session, SQLModel
+import shutil
+import time
+from collections import Counter
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
+from app.cache import TTLCache
+from app.pooling import pool_options, apply_sqlite_pragmas, is_sqlite, is_memory_sqlite
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Default to SQLite for easier local development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./local_service_finder.db")
 
@@ -13,23 +26,135 @@ if os.getenv("VERCEL") and DATABASE_URL.startswith("sqlite:///"):
     db_filename = DATABASE_URL.split("/")[-1]
     DATABASE_URL = f"sqlite:////tmp/{db_filename}"
 
+# Prebuilt SQLite file (see `seed.py --schema-only --image`) copied in place of a
+# missing database, so a cold start on an empty /tmp skips building the schema.
+# Off unless set; relative paths are resolved against the backend directory.
+SQLITE_IMAGE = os.getenv("SQLITE_IMAGE", "")
+if SQLITE_IMAGE:
+    SQLITE_IMAGE = os.path.join(os.path.dirname(os.path.dirname(__file__)), SQLITE_IMAGE)
+
 # Ensure the directory for the database exists if it's a file-based SQLite URL
 if DATABASE_URL.startswith("sqlite:///"):
     db_path = DATABASE_URL.replace("sqlite:///", "")
     db_dir = os.path.dirname(db_path)
     if db_dir and not os.path.exists(db_dir):
         os.makedirs(db_dir, exist_ok=True)
+    if SQLITE_IMAGE and db_path != ":memory:" and not os.path.exists(db_path) and os.path.exists(SQLITE_IMAGE):
+        # Copy then rename, so a concurrent start never opens a half-written file
+        shutil.copyfile(SQLITE_IMAGE, db_path + ".image")
+        os.replace(db_path + ".image", db_path)
 
 # SQLite connection arguments
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **pool_options(DATABASE_URL))
+if is_sqlite(DATABASE_URL):
+    apply_sqlite_pragmas(engine)
+
+def to_async_url(url: str) -> str:
+    # Same database through an asyncio driver: aiosqlite for SQLite, asyncpg for Postgres
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql://", "postgres://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Used by the API routers; the sync engine above serves startup DDL and CLI scripts
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, asyncio=True))
+if is_sqlite(ASYNC_DATABASE_URL):
+    apply_sqlite_pragmas(async_engine)
+
+# Optional read replica for GET/HEAD requests; without one, reads use the primary
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+ASYNC_READ_DATABASE_URL = os.getenv(
+    "ASYNC_READ_DATABASE_URL", to_async_url(READ_DATABASE_URL) if READ_DATABASE_URL else ""
+)
+# A client that wrote keeps reading from the primary this long, to cover replication lag
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# After the replica fails to connect, reads go to the primary this long before retrying it
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+def read_only_url(url: str):
+    # SQLite replicas are opened read-only, which also fails (rather than
+    # creating an empty database) when the file is missing
+    if not is_sqlite(url) or is_memory_sqlite(url):
+        return url
+    parsed = make_url(url)
+    return parsed.set(database=f"file:{parsed.database}", query={**parsed.query, "mode": "ro", "uri": "true"})
+
+read_engine = None
+if ASYNC_READ_DATABASE_URL:
+    read_engine = create_async_engine(
+        read_only_url(ASYNC_READ_DATABASE_URL), **pool_options(ASYNC_READ_DATABASE_URL, asyncio=True)
+    )
+    if is_sqlite(ASYNC_READ_DATABASE_URL):
+        apply_sqlite_pragmas(read_engine, read_only=True)
+
+READ_METHODS = {"GET", "HEAD"}
+# Clients that wrote recently, keyed by bearer token or, when anonymous, by address.
+# Per worker, like the other in-process caches.
+recent_writers = TTLCache(
+    maxsize=int(os.getenv("READ_YOUR_WRITES_MAX_CLIENTS", "10000")), ttl=READ_YOUR_WRITES_SECONDS
+)
+# Sessions opened per target: primary, replica, and reads that fell back from the replica
+session_routes: Counter = Counter()
+_replica_down_until = 0.0
 
 def create_db_and_tables():
-    # Import models here to ensure they are registered with SQLModel.metadata
-    from app import models
-    SQLModel.metadata.create_all(engine)
+    # Creates or upgrades the schema; a no-op beyond one lookup once current
+    from app.migrations import migrate
+    migrate(engine)
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+def _client_key(request: Request) -> str:
+    return request.headers.get("authorization") or (request.client.host if request.client else "")
+
+async def _replica_session():
+    global _replica_down_until
+    if time.monotonic() < _replica_down_until:
+        session_routes["fallback"] += 1
+        return None
+    session = AsyncSession(read_engine, expire_on_commit=False)
+    try:
+        await session.connection()
+    except (OSError, DBAPIError) as exc:
+        await session.close()
+        logger.warning(f"Read replica unavailable, reading from the primary: {exc}")
+        _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        session_routes["fallback"] += 1
+        return None
+    session.info["replica"] = True
+    session_routes["replica"] += 1
+    return session
+
+async def open_async_session(replica: bool = False) -> AsyncSession:
+    """A session on the read replica when `replica` is set and one is configured
+    and reachable, otherwise on the primary. The caller closes it."""
+    session = await _replica_session() if replica and read_engine is not None else None
+    if session is None:
+        # Objects stay readable after commit without an implicit (blocking) refresh
+        session = AsyncSession(async_engine, expire_on_commit=False)
+        session_routes["primary"] += 1
+    return session
+
+async def get_async_session(request: Request):
+    """Request-scoped session. Reads go to the replica when one is configured,
+    unless this client wrote within READ_YOUR_WRITES_SECONDS; writes, and reads
+    while the replica is unreachable, go to the primary."""
+    reading = request.method in READ_METHODS
+    session = await open_async_session(reading and recent_writers.get(_client_key(request)) is None)
+    if session.info.get("replica"):
+        # A lagging replica's answer is fine for this client, not for everyone (see responsecache)
+        request.state.replica_read = True
+    try:
+        yield session
+    finally:
+        await session.close()
+        if not reading:
+            recent_writers.set(_client_key(request), True)
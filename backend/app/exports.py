@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from enum import Enum
+from typing import AsyncIterator, List, Optional, Sequence
+from sqlmodel import select
+from app.database import open_async_session
+from app.models import User, ServiceProvider, Booking, BookingStatus, Review
+
+# Rows fetched per round trip; memory use is bounded by this, not by table size
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_COLUMNS = {
+    "bookings": [
+        Booking.id, Booking.user_id, Booking.provider_id, Booking.status, Booking.date_time,
+        Booking.duration_minutes, Booking.end_time, Booking.created_at,
+    ],
+    "providers": [
+        ServiceProvider.id, ServiceProvider.user_id, User.name, User.email, ServiceProvider.services,
+        ServiceProvider.experience, ServiceProvider.verified, ServiceProvider.contact_info,
+        ServiceProvider.location_pincode, ServiceProvider.rating_avg, ServiceProvider.rating_count,
+        User.created_at,
+    ],
+    "reviews": [
+        Review.id, Review.booking_id, Booking.provider_id, Booking.user_id, Review.rating,
+        Review.comment, Review.created_at,
+    ],
+}
+
+def export_statement(
+    dataset: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[BookingStatus] = None,
+    verified: Optional[bool] = None,
+    after_id: Optional[int] = None,
+):
+    # Ordered by id, so an interrupted export resumes with after_id=<last id received>
+    columns = EXPORT_COLUMNS[dataset]
+    key = columns[0]
+    statement = select(*columns)
+    if dataset == "providers":
+        statement = statement.join(User, User.id == ServiceProvider.user_id)
+        created_at = User.created_at
+        if verified is not None:
+            statement = statement.where(ServiceProvider.verified == verified)
+    elif dataset == "reviews":
+        statement = statement.join(Booking, Booking.id == Review.booking_id)
+        created_at = Review.created_at
+    else:
+        created_at = Booking.created_at
+        if status:
+            statement = statement.where(Booking.status == status)
+    # Date ranges are inclusive UTC calendar days of created_at, as in the analytics rollups
+    if start_date:
+        statement = statement.where(created_at >= datetime.combine(start_date, time.min, tzinfo=timezone.utc))
+    if end_date:
+        statement = statement.where(created_at < datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc))
+    if after_id is not None:
+        statement = statement.where(key > after_id)
+    return statement.order_by(key)
+
+def column_names(dataset: str) -> List[str]:
+    return [column.key for column in EXPORT_COLUMNS[dataset]]
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+def to_csv(rows: Sequence, header: Optional[List[str]] = None) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def to_ndjson(rows: Sequence, names: List[str]) -> str:
+    return "".join(json.dumps(dict(zip(names, map(_plain, row)))) + "\n" for row in rows)
+
+async def stream_export(statement, dataset: str, fmt: str) -> AsyncIterator[str]:
+    """Yields the export one batch at a time from a server-side cursor.
+
+    Uses its own session, on the read replica when there is one and it is
+    reachable: the request's session is closed by the time a streaming
+    response body is being sent."""
+    names = column_names(dataset)
+    if fmt == "csv":
+        yield to_csv([], names)
+    async with await open_async_session(replica=True) as session:
+        result = await session.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield to_csv(rows) if fmt == "csv" else to_ndjson(rows, names)
@@ -0,0 +1,77 @@
+import csv
+import logging
+import math
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# CSV with header "pincode,latitude,longitude"; one centroid per pincode
+PINCODE_CSV = os.getenv(
+    "PINCODE_CSV",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "pincodes.csv")
+)
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+class PincodeIndex:
+    """Uniform lat/lon grid over pincode centroids, built once and queried in memory."""
+
+    def __init__(self, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        self.centroids: Dict[str, Tuple[float, float]] = {}
+        self.cells: Dict[Tuple[int, int], List[Tuple[str, float, float]]] = defaultdict(list)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def add(self, pincode: str, lat: float, lon: float):
+        if pincode in self.centroids:
+            return
+        self.centroids[pincode] = (lat, lon)
+        self.cells[self._cell(lat, lon)].append((pincode, lat, lon))
+
+    def load_csv(self, path: str) -> int:
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                self.add(row["pincode"].strip(), float(row["latitude"]), float(row["longitude"]))
+        return len(self.centroids)
+
+    def nearby(self, pincode: str, radius_km: float) -> Optional[List[Tuple[str, float]]]:
+        # Pincodes within radius_km of `pincode`, nearest first; None if it is unknown
+        origin = self.centroids.get(pincode)
+        if origin is None:
+            return None
+        lat, lon = origin
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        lat_lo, lon_lo = self._cell(lat - lat_span, lon - lon_span)
+        lat_hi, lon_hi = self._cell(lat + lat_span, lon + lon_span)
+
+        matches = []
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lon_lo, lon_hi + 1):
+                for code, clat, clon in self.cells.get((i, j), ()):
+                    distance = haversine_km(lat, lon, clat, clon)
+                    if distance <= radius_km:
+                        matches.append((code, round(distance, 3)))
+        matches.sort(key=lambda m: (m[1], m[0]))
+        return matches
+
+pincode_index = PincodeIndex()
+
+def load_pincode_index(path: str = PINCODE_CSV):
+    if not os.path.exists(path):
+        logger.warning(f"Pincode centroid file not found at {path}; radius search will match exact pincodes only")
+        return
+    count = pincode_index.load_csv(path)
+    logger.info(f"Loaded {count} pincode centroids from {path}")
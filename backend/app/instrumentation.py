@@ -0,0 +1,215 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Pattern, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import compile_path
+from app.metrics import Histogram, format_header, format_histogram, format_labels, format_value
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their SQL and route; 0 disables the log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+# Adds a Server-Timing header (total and DB time) to every response
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1").lower() in ("1", "true", "yes")
+
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class RequestStats:
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+        self._route: Optional[str] = None
+
+    @property
+    def route(self) -> str:
+        if self._route is None:
+            self._route = route_template(self.scope)
+        return self._route
+
+# A mutable holder, so statements run in threadpool or greenlet copies of the
+# request context are recorded on the same object
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_route_table: Optional[List[Tuple[Pattern, Set[str], str]]] = None
+
+def _route_paths(routes, prefix: str = ""):
+    # (template, methods) for every endpoint. Newer FastAPI keeps included
+    # routers as nested entries holding their prefix instead of flattening them.
+    for route in routes:
+        included = getattr(route, "original_router", None)
+        if included is not None:
+            yield from _route_paths(included.routes, prefix + route.include_context.prefix)
+        elif getattr(route, "methods", None):
+            yield prefix + route.path, {method.lower() for method in route.methods}
+
+def route_template(scope) -> str:
+    # "/providers/{provider_id}" rather than the raw path, so labels stay bounded.
+    # Matched against the app's route table rather than the routing result, which
+    # also covers requests a middleware answers without routing (response cache
+    # hits). Walked directly, since building the OpenAPI schema here would add
+    # well over 100ms to a cold start's first request.
+    global _route_table
+    if _route_table is None:
+        if "app" not in scope:
+            return "unmatched"
+        _route_table = [
+            (compile_path(path)[0], methods, path) for path, methods in _route_paths(scope["app"].routes)
+        ]
+    method = scope["method"].lower()
+    for regex, methods, template in _route_table:
+        if method in methods and regex.match(scope["path"]):
+            return template
+    return "unmatched"
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        route = f"{stats.scope['method']} {stats.route}" if stats is not None else "(no request)"
+        logger.warning(f"Slow query ({elapsed * 1000:.1f} ms) from {route}:\n{statement}")
+
+@event.listens_for(Engine, "handle_error")
+def _discard_timer(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_time = Histogram(buckets=DB_BUCKETS)
+        self.queries = 0
+        self.statuses: Counter = Counter()
+
+class MetricsRegistry:
+    """Per-route request latency, DB time and query counts."""
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = RouteMetrics()
+            metrics.queries += stats.queries
+            metrics.statuses[status] += 1
+        metrics.latency.observe(elapsed)
+        metrics.db_time.observe(stats.db_time)
+
+    def render(self) -> str:
+        with self._lock:
+            routes = sorted(self._routes.items())
+        lines: List[str] = []
+        lines += format_header("http_requests_total", "counter", "Requests by route and status code.")
+        for (method, route), metrics in routes:
+            for status, count in sorted(metrics.statuses.items()):
+                labels = {"method": method, "route": route, "status": status}
+                lines.append(f"http_requests_total{format_labels(labels)} {count}")
+        lines += format_header("http_request_duration_seconds", "histogram", "Request latency by route.")
+        for (method, route), metrics in routes:
+            lines += format_histogram("http_request_duration_seconds", {"method": method, "route": route}, metrics.latency)
+        lines += format_header("http_request_db_seconds", "histogram", "Time spent in SQL per request, by route.")
+        for (method, route), metrics in routes:
+            lines += format_histogram("http_request_db_seconds", {"method": method, "route": route}, metrics.db_time)
+        lines += format_header("http_request_db_queries_total", "counter", "SQL statements issued, by route.")
+        for (method, route), metrics in routes:
+            lines.append(f"http_request_db_queries_total{format_labels({'method': method, 'route': route})} {metrics.queries}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+class RequestMetricsMiddleware:
+    """Times each HTTP request, counts its SQL, and adds a Server-Timing header."""
+
+    def __init__(self, app, metrics: MetricsRegistry = registry):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    timing = f'app;dur={total_ms:.1f}, db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _current_request.reset(token)
+            self.metrics.record(scope["method"], stats.route, status, time.perf_counter() - start, stats)
+
+def render_metrics() -> str:
+    """Everything /metrics exposes: per-route request metrics plus pool and cache gauges."""
+    from app.database import engine, async_engine, read_engine, session_routes
+    from app.auth import principal_cache
+    from app.passwords import hashing_pool
+    from app.responsecache import response_cache
+    from app.jobs import worker
+    from app.admission import limiter, shed_requests
+
+    lines = [registry.render().rstrip("\n")]
+    lines += format_header("db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a pooled connection.")
+    for name, pool_engine in (("sync", engine), ("async", async_engine), ("replica", read_engine)):
+        if pool_engine is None:
+            continue
+        wait_time = getattr(getattr(pool_engine, "sync_engine", pool_engine).pool, "wait_time", None)
+        if wait_time is not None:
+            lines += format_histogram("db_pool_checkout_wait_seconds", {"pool": name}, wait_time)
+    lines += format_header("db_sessions_total", "counter", "Request sessions opened per database; fallback counts replica reads served by the primary.")
+    for target in ("primary", "replica", "fallback"):
+        lines.append(f"db_sessions_total{format_labels({'target': target})} {session_routes[target]}")
+    lines += format_header("rate_limited_total", "counter", "Requests rejected with 429 by a rate limit, by limit and key type.")
+    for (limit, keyed_by), count in sorted(limiter.rejected.items()):
+        lines.append(f"rate_limited_total{format_labels({'limit': limit, 'key': keyed_by})} {count}")
+    lines += format_header("load_shed_total", "counter", "Requests rejected with 503 by a route's concurrency cap.")
+    for route, count in sorted(shed_requests.items()):
+        method, _, template = route.partition(" ")
+        lines.append(f"load_shed_total{format_labels({'method': method, 'route': template})} {count}")
+    lines += format_header("job_queue_depth", "gauge", "Queued background jobs by kind and status.")
+    for (kind, status), count in sorted(worker.depth.items()):
+        lines.append(f"job_queue_depth{format_labels({'kind': kind, 'status': status})} {count}")
+    lines += format_header("job_queue_lag_seconds", "gauge", "Age of the oldest background job still waiting to run.")
+    lines.append(f"job_queue_lag_seconds {format_value(worker.lag)}")
+    lines += format_header("jobs_processed_total", "counter", "Background jobs run, by kind and outcome (done, retried, failed).")
+    for (kind, outcome), count in sorted(worker.processed.items()):
+        lines.append(f"jobs_processed_total{format_labels({'kind': kind, 'outcome': outcome})} {count}")
+    lines += format_header("job_latency_seconds", "histogram", "Time from enqueue to successful completion.")
+    lines += format_histogram("job_latency_seconds", {}, worker.latency)
+    lines += format_header("password_hash_duration_seconds", "histogram", "bcrypt hash and verify latency.")
+    lines += format_histogram("password_hash_duration_seconds", {}, hashing_pool.latency)
+    lines += format_header("password_hash_rejected_total", "counter", "Hashing calls shed because the pool was full.")
+    lines.append(f"password_hash_rejected_total {hashing_pool.rejected}")
+    for cache_name, stats in (("response", response_cache.stats()), ("auth", principal_cache.stats())):
+        for field in ("hits", "misses"):
+            metric = f"{cache_name}_cache_{field}_total"
+            lines += format_header(metric, "counter", f"{cache_name.capitalize()} cache {field}.")
+            lines.append(f"{metric} {stats[field]}")
+    return "\n".join(lines) + "\n"
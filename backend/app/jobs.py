@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select, func, update, delete, insert, col
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.metrics import Histogram
+from app.models import Job, JobStatus, AdminLog
+
+logger = logging.getLogger(__name__)
+
+# Side effects of a write (rating aggregates, search documents, audit log)
+# are enqueued as Job rows in the writer's own transaction and run by a worker
+# after commit, so the request only pays for its primary insert. The worker
+# claims jobs in batches, runs each kind's handler once per batch, and retries
+# failures with exponential backoff. A job's handler work and its deletion
+# commit together, so handlers may apply deltas: each job counts exactly once.
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "200"))
+# Idle poll interval; commits that enqueue wake the in-process worker immediately
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "1"))
+# A claimed job not finished within this long (e.g. the worker died) is run again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Set to 0 to run the worker as its own process (python -m app.jobs --watch) instead
+JOB_WORKER = os.getenv("JOB_WORKER", "1") != "0"
+
+# kind -> handler(session, payloads) returning response cache tags to invalidate.
+# A handler gets every claimed job of its kind at once, one payload per key
+# (jobs without a key are all kept), and merges them itself.
+HANDLERS: Dict[str, Callable[[Session, List[dict]], Iterable[str]]] = {}
+
+def handler(kind: str):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+def enqueue(session, kind: str, payload: Optional[dict] = None, key: Optional[str] = None):
+    """Adds a job to the caller's (sync or async) session; it exists only if that transaction commits."""
+    session.add(Job(kind=kind, key=key, payload=json.dumps(payload or {})))
+    session.info["jobs_enqueued"] = True
+
+@event.listens_for(OrmSession, "after_commit")
+def _wake_worker(session):
+    if session.info.pop("jobs_enqueued", False):
+        worker.wake()
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they were written as UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _coalesce(jobs) -> List[dict]:
+    payloads: Dict[object, dict] = {}
+    for job in jobs:
+        payloads[job.key if job.key is not None else ("job", job.id)] = json.loads(job.payload)
+    return list(payloads.values())
+
+class JobWorker:
+    def __init__(self):
+        self.processed: Counter = Counter()  # (kind, outcome) -> jobs
+        self.latency = Histogram(buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0, 300.0))
+        self.depth: Dict[tuple, int] = {}  # (kind, status) -> jobs
+        self.lag = 0.0  # Age of the oldest job waiting to run, in seconds
+        self._stats_at = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _claim(self, session: Session) -> List:
+        now = datetime.now(timezone.utc)
+        # Pending, or running with an expired lease
+        claimable = (col(Job.status).in_([JobStatus.PENDING, JobStatus.RUNNING]), Job.run_after <= now)
+        due = (
+            select(Job.id)
+            .where(*claimable)
+            .order_by(Job.id)
+            .limit(JOB_BATCH_SIZE)
+            # Postgres: concurrent workers skip each other's rows instead of
+            # waiting to claim them again; SQLite serializes writers anyway
+            .with_for_update(skip_locked=True)
+        )
+        jobs = session.exec(
+            update(Job)
+            # Re-checked on the row as updated, so a row claimed meanwhile is left alone
+            .where(col(Job.id).in_(due), *claimable)
+            .values(status=JobStatus.RUNNING, attempts=Job.attempts + 1, run_after=now + timedelta(seconds=JOB_LEASE_SECONDS))
+            .returning(Job.id, Job.kind, Job.key, Job.payload, Job.attempts, Job.created_at, Job.run_after)
+        ).all()
+        session.commit()
+        return jobs
+
+    def _run_kind(self, session: Session, kind: str, jobs) -> List[str]:
+        ids = [job.id for job in jobs]
+        try:
+            tags = list(HANDLERS[kind](session, _coalesce(jobs)))  # Unknown kinds fail like any error
+            # Only while our lease holds: once it expires another worker may have
+            # claimed (and be running) the same jobs, and deltas must not apply twice
+            deleted = session.exec(delete(Job).where(col(Job.id).in_(ids), Job.run_after == jobs[0].run_after))
+            if deleted.rowcount != len(ids):
+                session.rollback()
+                logger.warning(f"Lease on {len(jobs)} {kind} job(s) expired before they finished; left to their new claimant")
+                return []
+            session.commit()
+        except Exception as exc:
+            session.rollback()
+            error = f"{type(exc).__name__}: {exc}"
+            if len(jobs) == 1:
+                logger.exception(f"{kind} job {jobs[0].id} failed")
+                self._retry(session, kind, jobs[0], error)
+                return []
+        else:
+            now = datetime.now(timezone.utc)
+            for job in jobs:
+                self.latency.observe((now - _utc(job.created_at)).total_seconds())
+            self.processed[(kind, "done")] += len(jobs)
+            return tags
+        # Bisect, so only the failing job is retried and the rest still run
+        logger.warning(f"{len(jobs)} {kind} jobs failed together ({error}), splitting the batch")
+        half = len(jobs) // 2
+        return self._run_kind(session, kind, jobs[:half]) + self._run_kind(session, kind, jobs[half:])
+
+    def _retry(self, session: Session, kind: str, job, error: str):
+        exhausted = job.attempts >= JOB_MAX_ATTEMPTS
+        session.exec(update(Job).where(Job.id == job.id).values(
+            status=JobStatus.FAILED if exhausted else JobStatus.PENDING,
+            run_after=datetime.now(timezone.utc) + timedelta(seconds=JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)),
+            last_error=error[:1000],
+        ))
+        session.commit()
+        self.processed[(kind, "failed" if exhausted else "retried")] += 1
+
+    def run_batch(self, session: Session) -> int:
+        """Claims and runs one batch; returns the number of jobs claimed."""
+        from app.responsecache import response_cache
+        jobs = self._claim(session)
+        by_kind: Dict[str, list] = {}
+        for job in jobs:
+            by_kind.setdefault(job.kind, []).append(job)
+        for kind, kind_jobs in by_kind.items():
+            tags = self._run_kind(session, kind, kind_jobs)
+            if tags:
+                response_cache.invalidate(*tags)
+        return len(jobs)
+
+    def refresh_stats(self, session: Session):
+        rows = session.exec(
+            select(Job.kind, Job.status, func.count(), func.min(Job.created_at)).group_by(Job.kind, Job.status)
+        ).all()
+        session.rollback()
+        now = datetime.now(timezone.utc)
+        self.depth = {(kind, status.value): count for kind, status, count, _ in rows}
+        waiting = [_utc(oldest) for _, status, _, oldest in rows if status != JobStatus.FAILED]
+        self.lag = (now - min(waiting)).total_seconds() if waiting else 0.0
+
+    async def run_once(self) -> int:
+        from app.database import async_engine
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            claimed = await session.run_sync(self.run_batch)
+            if claimed or time.monotonic() - self._stats_at >= JOB_POLL_SECONDS:
+                await session.run_sync(self.refresh_stats)
+                self._stats_at = time.monotonic()
+        return claimed
+
+    async def run(self, until_empty: bool = False):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Job worker iteration failed")
+                claimed = 0
+            if claimed:
+                continue
+            if until_empty:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+
+    def stats(self):
+        return {
+            "running": self._task is not None,
+            "depth": {f"{kind}/{status}": count for (kind, status), count in self.depth.items()},
+            "lag_seconds": round(self.lag, 3),
+            "processed": {f"{kind}/{outcome}": count for (kind, outcome), count in self.processed.items()},
+            "latency": self.latency.summary(),
+        }
+
+worker = JobWorker()
+
+@handler("provider_rating")
+def _provider_ratings(session: Session, payloads: List[dict]):
+    # Review deltas summed per provider: one O(1) UPDATE each, however many reviews
+    from app.ratings import add_ratings, refresh_ratings
+    from app.responsecache import providers_tag, provider_tag
+    deltas: Dict[int, List[int]] = {}
+    recount = set()
+    for payload in payloads:
+        if "rating" not in payload:
+            recount.add(payload["provider_id"])  # Queued by an older release
+            continue
+        delta = deltas.setdefault(payload["provider_id"], [0, 0])
+        delta[0] += payload["rating"]
+        delta[1] += 1
+    for provider_id, (rating_sum, rating_count) in sorted(deltas.items()):
+        add_ratings(session, provider_id, rating_sum, rating_count)
+    if recount:
+        refresh_ratings(session, sorted(recount))
+    provider_ids = sorted(deltas.keys() | recount)
+    return [providers_tag(), *(provider_tag(provider_id) for provider_id in provider_ids)]
+
+@handler("search_document")
+def _search_documents(session: Session, payloads: List[dict]):
+    # New review comments appended per provider, not a rebuild of the document
+    from app.search import add_review_text, index_provider
+    from app.responsecache import providers_tag
+    comments: Dict[int, List[str]] = {}
+    for payload in payloads:
+        if "comment" not in payload:
+            index_provider(session, payload["provider_id"])  # Queued by an older release
+            continue
+        comments.setdefault(payload["provider_id"], []).append(payload["comment"])
+    for provider_id, texts in sorted(comments.items()):
+        add_review_text(session, provider_id, " ".join(texts))
+    return [providers_tag()]
+
+@handler("admin_log")
+def _admin_logs(session: Session, payloads: List[dict]):
+    # One multi-row insert for the whole batch
+    session.exec(insert(AdminLog), params=[
+        {**payload, "timestamp": datetime.fromisoformat(payload["timestamp"])} for payload in payloads
+    ])
+    return []
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued background jobs.")
+    parser.add_argument("--watch", action="store_true", help="keep running instead of exiting once the queue is empty")
+    parser.add_argument("--retry-failed", action="store_true", help="requeue jobs that ran out of attempts first")
+    args = parser.parse_args()
+    from app.database import engine, create_db_and_tables
+    create_db_and_tables()
+    if args.retry_failed:
+        with Session(engine) as session:
+            result = session.exec(
+                update(Job).where(Job.status == JobStatus.FAILED)
+                .values(status=JobStatus.PENDING, attempts=0, run_after=datetime.now(timezone.utc))
+            )
+            session.commit()
+            print(f"Requeued {result.rowcount} failed jobs.")
+    asyncio.run(worker.run(until_empty=not args.watch))
+    print(json.dumps(worker.stats(), indent=2, default=str))
@@ -2,10 +2,16 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import logging
+import os
 import traceback
 from app.database import create_db_and_tables
+from app.geo import load_pincode_index
+from app.instrumentation import RequestMetricsMiddleware, render_metrics
+from app.admission import ConcurrencyLimitMiddleware
+from app.jobs import worker, JOB_WORKER
+from app.responsecache import ResponseCacheMiddleware
 from app.routers import auth, users, providers, bookings, reviews, admin
 
 # Configure logging
@@ -14,11 +20,15 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create tables
+    # Startup: Create tables and build the in-memory pincode index
     create_db_and_tables()
+    load_pincode_index()
+    # Post-commit side effects queued by the routers
+    if JOB_WORKER:
+        worker.start()
     yield
-    # Shutdown: Clean up if needed
-    pass
+    # Shutdown: stop the job worker; unfinished jobs stay queued
+    await worker.stop()
 
 app = FastAPI(
     title="Local Service Finder – Neighborhood Helper App",
@@ -37,6 +47,15 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": "Internal Server Error", "message": "An unexpected error occurred. Please check the server logs for more details."},
     )
 
+# Per-route in-flight caps; inside the response cache, so cache hits never take a slot
+app.add_middleware(ConcurrencyLimitMiddleware)
+
+# Server-side cache for public read routes (inside CORS so cached responses get CORS headers)
+app.add_middleware(ResponseCacheMiddleware)
+
+# Per-route latency and SQL metrics; outside the response cache so hits are timed too
+app.add_middleware(RequestMetricsMiddleware)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -58,13 +77,35 @@ app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 def read_root():
     return {"message": "Welcome to Local Service Finder API", "app_name": "Seva-Connect"}
 
+@app.get("/metrics")
+def metrics(request: Request):
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/health")
 def health_check():
-    import os
-    from app.database import DATABASE_URL
+    from app.database import DATABASE_URL, engine, async_engine, read_engine, session_routes
+    from app.pooling import pool_stats
+    from app.responsecache import response_cache
+    from app.auth import principal_cache
+    from app.passwords import hashing_pool
+    from app.admission import admission_stats
     return {
         "status": "ok",
         "vercel": os.getenv("VERCEL") is not None,
         "database_url_type": "sqlite" if DATABASE_URL.startswith("sqlite") else "remote",
-        "database_path": DATABASE_URL if DATABASE_URL.startswith("sqlite") else "HIDDEN"
+        "database_path": DATABASE_URL if DATABASE_URL.startswith("sqlite") else "HIDDEN",
+        "auth_cache": principal_cache.stats(),
+        "password_hashing": hashing_pool.stats(),
+        "db_pool": {
+            "sync": pool_stats(engine),
+            "async": pool_stats(async_engine),
+            **({"replica": pool_stats(read_engine)} if read_engine is not None else {}),
+        },
+        "db_sessions": dict(session_routes),
+        "jobs": worker.stats(),
+        "admission": admission_stats(),
+        "response_cache": response_cache.stats(),
     }
@@ -0,0 +1,63 @@
+import bisect
+import threading
+from typing import Dict, List, Sequence
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (Prometheus semantics)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            cumulative = []
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                running += count
+                cumulative.append((bound, running))
+            return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            }
+
+# Prometheus text exposition format (version 0.0.4)
+def format_labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def format_histogram(name: str, labels: Dict[str, object], histogram: Histogram) -> List[str]:
+    snapshot = histogram.snapshot()
+    lines = [
+        f"{name}_bucket{format_labels({**labels, 'le': format_value(bound)})} {count}"
+        for bound, count in snapshot["buckets"]
+    ]
+    lines.append(f"{name}_sum{format_labels(labels)} {format_value(snapshot['sum'])}")
+    lines.append(f"{name}_count{format_labels(labels)} {snapshot['count']}")
+    return lines
+
+def format_header(name: str, kind: str, help_text: str) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
@@ -0,0 +1,183 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, SQLModel, select, func
+
+logger = logging.getLogger(__name__)
+
+# Versioned, in-place schema upgrades. New databases are built with create_all
+# and stamped at LATEST_VERSION; older ones get missing tables from create_all
+# plus every pending step. Steps must be idempotent, since databases from
+# earlier releases may already have part of a step's changes.
+
+def add_column(conn: Connection, table: str, column: str, ddl: str):
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+def create_indexes(conn: Connection, *names: str):
+    # Creates indexes declared on the models, looked up by name
+    for table in SQLModel.metadata.tables.values():
+        for index in table.indexes:
+            if index.name in names:
+                index.create(conn, checkfirst=True)
+
+def _rating_aggregates(conn: Connection):
+    add_column(conn, "serviceprovider", "rating_sum", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "serviceprovider", "rating_count", "INTEGER NOT NULL DEFAULT 0")
+    from app.ratings import recompute_ratings
+    with Session(bind=conn) as session:
+        recompute_ratings(session)
+
+def _category_links(conn: Connection):
+    from app.categories import backfill_categories
+    with Session(bind=conn) as session:
+        backfill_categories(session)
+
+def _hot_path_indexes(conn: Connection):
+    create_indexes(
+        conn,
+        "ix_booking_status",
+        "ix_serviceprovider_user_id",
+        "ix_serviceprovider_location_pincode",
+        "ix_serviceprovider_verified_rating_avg",
+    )
+
+def _booking_rollups(conn: Connection):
+    from app.rollups import rebuild_rollups
+    with Session(bind=conn) as session:
+        rebuild_rollups(session)
+
+def _booking_schedule(conn: Connection):
+    sqlite = conn.dialect.name == "sqlite"
+    # SQLite stores TIME as text in the ORM's 'HH:MM:SS.ffffff' format
+    time_default = "'{}:00:00.000000'" if sqlite else "'{}:00'"
+    add_column(conn, "serviceprovider", "work_start", "TIME NOT NULL DEFAULT " + time_default.format("09"))
+    add_column(conn, "serviceprovider", "work_end", "TIME NOT NULL DEFAULT " + time_default.format("18"))
+    add_column(conn, "serviceprovider", "working_days", "VARCHAR NOT NULL DEFAULT '0,1,2,3,4,5'")
+    add_column(conn, "booking", "duration_minutes", "INTEGER NOT NULL DEFAULT 60")
+    add_column(conn, "booking", "end_time", "TIMESTAMP")
+    if sqlite:
+        # Keep the fractional seconds so text comparisons line up with ORM-written values
+        end_time = "datetime(date_time, '+' || duration_minutes || ' minutes') || substr(date_time, 20)"
+    else:
+        end_time = "date_time + duration_minutes * interval '1 minute'"
+    conn.execute(text(f"UPDATE booking SET end_time = {end_time} WHERE end_time IS NULL"))
+    create_indexes(conn, "ix_booking_provider_status_date_time")
+
+def _search_index(conn: Connection):
+    from app.search import create_search_index, rebuild_search_index
+    create_search_index(conn)
+    with Session(bind=conn) as session:
+        rebuild_search_index(session)
+
+def _ranking_score(conn: Connection):
+    add_column(conn, "serviceprovider", "score", "FLOAT NOT NULL DEFAULT 0")
+    add_column(conn, "serviceprovider", "recent_bookings", "INTEGER NOT NULL DEFAULT 0")
+    from app.ratings import recompute_scores
+    with Session(bind=conn) as session:
+        recompute_scores(session)
+    create_indexes(conn, "ix_serviceprovider_verified_score")
+
+def _job_queue(conn: Connection):
+    SQLModel.metadata.tables["job"].create(conn, checkfirst=True)
+    create_indexes(conn, "ix_job_status_run_after")
+
+def _booking_history_indexes(conn: Connection):
+    create_indexes(conn, "ix_booking_user_id_date_time", "ix_booking_provider_id_date_time")
+    # Leading columns of the composites above, so only extra write cost now
+    for name in ("ix_booking_user_id", "ix_booking_provider_id"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+def _booking_overlaps(conn: Connection):
+    # Earlier releases could leave active bookings overlapping. They are only
+    # reported: an operator decides which to keep (python -m app.availability).
+    from app.availability import overlapping_bookings
+    with Session(bind=conn) as session:
+        pairs = overlapping_bookings(session)
+    if pairs:
+        logger.warning(
+            f"{len(pairs)} overlapping pending booking pairs need resolving, e.g. "
+            f"{', '.join(f'{a}/{b}' for a, b in pairs[:20])}; list them with python -m app.availability"
+        )
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Provider rating_sum/rating_count aggregates", _rating_aggregates),
+    (2, "Backfill provider category links", _category_links),
+    (3, "Indexes on booking and provider hot paths", _hot_path_indexes),
+    (4, "Backfill analytics booking rollups", _booking_rollups),
+    (5, "Provider working hours, booking durations and schedule index", _booking_schedule),
+    (6, "Full-text provider search index", _search_index),
+    (7, "Provider ranking score", _ranking_score),
+    (8, "Background job queue", _job_queue),
+    (9, "Booking history indexes by customer and provider date", _booking_history_indexes),
+    (10, "Report overlapping pending bookings", _booking_overlaps),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(engine: Engine) -> int:
+    from app.models import SchemaVersion
+    if not inspect(engine).has_table(SchemaVersion.__tablename__):
+        return 0
+    with Session(engine) as session:
+        return session.exec(select(func.max(SchemaVersion.version))).one() or 0
+
+def schema_fingerprint() -> int:
+    """Digest of the model metadata and migration list as a positive 31-bit int,
+    so it fits SQLite's user_version header field."""
+    from app import models  # noqa: F401 (registers the tables)
+    digest = hashlib.sha256(str(LATEST_VERSION).encode())
+    for table in sorted(SQLModel.metadata.tables.values(), key=lambda t: t.name):
+        digest.update(table.name.encode())
+        for column in table.columns:
+            digest.update(f"{column.name}:{column.type!r}:{column.nullable}".encode())
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            digest.update(index.name.encode())
+    return int.from_bytes(digest.digest()[:4], "big") & 0x7FFFFFFF or 1
+
+def stored_fingerprint(engine: Engine):
+    # Kept in the SQLite file header; one pragma, no catalogue queries
+    if engine.dialect.name != "sqlite":
+        return None
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+def store_fingerprint(engine: Engine, fingerprint: int):
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {int(fingerprint)}")
+
+def migrate(engine: Engine):
+    from app import models
+    # Fast path for cold starts: the file already matches these models
+    fingerprint = schema_fingerprint()
+    if stored_fingerprint(engine) == fingerprint:
+        return
+    version = current_version(engine)
+    if version >= LATEST_VERSION:
+        store_fingerprint(engine, fingerprint)
+        return
+
+    fresh = not inspect(engine).has_table(models.User.__tablename__)
+    SQLModel.metadata.create_all(engine)
+    pending = [] if fresh else [m for m in MIGRATIONS if m[0] > version]
+
+    for number, description, step in pending:
+        logger.info(f"Applying schema migration {number}: {description}")
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(models.SchemaVersion.__table__.insert().values(
+                version=number, description=description, applied_at=datetime.now(timezone.utc)
+            ))
+
+    if fresh:
+        from app.search import create_search_index
+        with engine.begin() as conn:
+            create_search_index(conn)  # Not expressible in the SQLModel metadata
+        with Session(engine) as session:
+            session.add(models.SchemaVersion(version=LATEST_VERSION, description="Initial schema"))
+            session.commit()
+    store_fingerprint(engine, fingerprint)
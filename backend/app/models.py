@@ -1,6 +1,6 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, time, timezone
 from typing import Optional, List
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Index
 from enum import Enum
 
 class UserRole(str, Enum):
@@ -13,6 +13,11 @@ class BookingStatus(str, Enum):
     COMPLETED = "completed"
     CANCELLED = "cancelled"
 
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
@@ -25,27 +30,64 @@ class User(SQLModel, table=True):
     provider_profile: Optional["ServiceProvider"] = Relationship(back_populates="user")
     bookings: List["Booking"] = Relationship(back_populates="customer")
 
+class ProviderCategoryLink(SQLModel, table=True):
+    provider_id: int = Field(foreign_key="serviceprovider.id", primary_key=True)
+    category_id: int = Field(foreign_key="servicecategory.id", primary_key=True, index=True)
+
+class ServiceCategory(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    slug: str = Field(unique=True, index=True)  # Lower-cased name used for lookups
+
+    # Relationships
+    providers: List["ServiceProvider"] = Relationship(back_populates="categories", link_model=ProviderCategoryLink)
+
 class ServiceProvider(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_serviceprovider_verified_rating_avg", "verified", "rating_avg"),
+        Index("ix_serviceprovider_verified_score", "verified", "score"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
     services: str  # Comma-separated or JSON string for categories
     experience: int # Years
     verified: bool = Field(default=False)
     contact_info: str
     profile_picture: Optional[str] = None
-    location_pincode: str
+    location_pincode: str = Field(index=True)
     rating_avg: float = Field(default=0.0)
+    rating_sum: int = Field(default=0)  # Maintained with rating_count on each review
+    rating_count: int = Field(default=0)
+    # Ranking score and its booking-volume input (see app.ratings)
+    score: float = Field(default=0.0)
+    recent_bookings: int = Field(default=0)
+    # Working hours in SERVICE_TIMEZONE; days are weekday numbers, Monday = 0
+    work_start: time = Field(default=time(9, 0))
+    work_end: time = Field(default=time(18, 0))
+    working_days: str = Field(default="0,1,2,3,4,5")
 
     # Relationships
     user: User = Relationship(back_populates="provider_profile")
     bookings: List["Booking"] = Relationship(back_populates="provider")
+    categories: List[ServiceCategory] = Relationship(back_populates="providers", link_model=ProviderCategoryLink)
 
 class Booking(SQLModel, table=True):
+    # Conflict checks seek the latest active booking starting before a slot ends;
+    # booking history pages walk a customer's or provider's bookings by date
+    __table_args__ = (
+        Index("ix_booking_provider_status_date_time", "provider_id", "status", "date_time"),
+        Index("ix_booking_user_id_date_time", "user_id", "date_time"),
+        Index("ix_booking_provider_id_date_time", "provider_id", "date_time"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     provider_id: int = Field(foreign_key="serviceprovider.id")
-    status: BookingStatus = Field(default=BookingStatus.PENDING)
+    status: BookingStatus = Field(default=BookingStatus.PENDING, index=True)
     date_time: datetime
+    duration_minutes: int = Field(default=60)
+    end_time: datetime  # date_time + duration_minutes
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     # Relationships
@@ -69,3 +111,41 @@ class AdminLog(SQLModel, table=True):
     target_user_id: Optional[int] = None
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     admin_id: int = Field(foreign_key="user.id")
+
+# Booking counts per day (of booking creation, UTC) and status, maintained
+# incrementally by app.rollups so analytics never scans Booking
+class CategoryBookingRollup(SQLModel, table=True):
+    day: date = Field(primary_key=True)
+    category_id: int = Field(foreign_key="servicecategory.id", primary_key=True)
+    status: BookingStatus = Field(primary_key=True)
+    count: int = Field(default=0)
+
+class PincodeBookingRollup(SQLModel, table=True):
+    day: date = Field(primary_key=True)
+    pincode: str = Field(primary_key=True)
+    status: BookingStatus = Field(primary_key=True)
+    count: int = Field(default=0)
+
+# Durable queue of post-commit side effects, run by app.jobs. Enqueued in the
+# writer's transaction; rows are deleted once their job succeeds.
+class Job(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_job_status_run_after", "status", "run_after"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str
+    # Pending jobs of one kind with the same key are run once
+    key: Optional[str] = None
+    payload: str = "{}"  # JSON
+    status: JobStatus = Field(default=JobStatus.PENDING)
+    attempts: int = Field(default=0)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Earliest next run: the retry backoff, or the lease of a running job
+    run_after: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    last_error: Optional[str] = None
+
+class SchemaVersion(SQLModel, table=True):
+    version: int = Field(primary_key=True)
+    description: str
+    applied_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
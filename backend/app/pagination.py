@@ -0,0 +1,50 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlmodel import and_, or_, desc
+
+# Bounds for the `limit` query parameter on paginated list endpoints
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(*values: Any) -> str:
+    # Opaque to clients: the sort key values of the last row on the page
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str], types: Sequence[Callable[[Any], Any]]) -> Optional[list]:
+    # `types` converts each value back to its sort key's type (int, float, datetime)
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        if any(value is None or isinstance(value, (bool, list, dict)) for value in values):
+            raise ValueError
+        return [convert(value) for convert, value in zip(types, values)]
+    except (TypeError, ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def cursor_datetime(value: str) -> datetime:
+    # Datetime sort keys are encoded with isoformat()
+    return datetime.fromisoformat(value)
+
+def keyset_after(keys: List[Tuple[Any, bool]], values: list):
+    # Rows strictly after `values` in the lexicographic order given by
+    # `keys`, a list of (column, descending) pairs
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        step = column < values[i] if descending else column > values[i]
+        ties = [keys[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*ties, step))
+    return or_(*clauses)
+
+def order_by_keys(keys: List[Tuple[Any, bool]]):
+    return [desc(column) if descending else column for column, descending in keys]
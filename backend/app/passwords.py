@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from app.metrics import Histogram
+
+# bcrypt work factor; hashes made with a different cost are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a thread pool gives real parallelism
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 2)))
+# Calls allowed to wait for a worker before new ones are rejected with 503
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "32"))
+
+_pwd_context = None
+
+def pwd_context():
+    # Built on first use; passlib and the bcrypt backend are not needed to serve reads
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
+class HashingPool:
+    """Bounded executor for bcrypt work that sheds load instead of queueing without limit."""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.latency = Histogram()
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _run(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+
+    def _release(self, future: Future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        with self._lock:
+            self._in_flight += 1
+        future = self._executor.submit(self._run, fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def stats(self):
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "workers": self.workers,
+            "in_flight": in_flight,
+            "queued": max(in_flight - self.workers, 0),
+            "rejected": self.rejected,
+            "hash_latency": self.latency.summary(),
+        }
+
+hashing_pool = HashingPool(BCRYPT_WORKERS, BCRYPT_MAX_QUEUE)
+
+def verify_password(plain_password, hashed_password):
+    return hashing_pool.submit(pwd_context().verify, plain_password, hashed_password).result()
+
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    # Returns (valid, new_hash); new_hash is set when the stored cost is outdated
+    return hashing_pool.submit(pwd_context().verify_and_update, plain_password, hashed_password).result()
+
+def get_password_hash(password):
+    return hashing_pool.submit(pwd_context().hash, password).result()
+
+async def averify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    return await asyncio.wrap_future(
+        hashing_pool.submit(pwd_context().verify_and_update, plain_password, hashed_password)
+    )
+
+async def aget_password_hash(password):
+    return await asyncio.wrap_future(hashing_pool.submit(pwd_context().hash, password))
@@ -0,0 +1,92 @@
+import os
+import time
+from typing import Any, Dict
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from app.metrics import Histogram
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value is None else value.lower() in ("1", "true", "yes")
+
+class _TimedCheckout:
+    # Records how long each checkout waited for a pooled connection
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_time = Histogram(buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_time.observe(time.perf_counter() - start)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def is_memory_sqlite(url: str) -> bool:
+    return is_sqlite(url) and (":memory:" in url or url.split("://", 1)[-1] in ("", "/"))
+
+def pool_options(url: str, asyncio: bool = False) -> Dict[str, Any]:
+    """create_engine kwargs from DB_POOL_* environment variables."""
+    if is_memory_sqlite(url):
+        # In-memory databases live and die with a single connection
+        return {}
+    remote = not is_sqlite(url)
+    return {
+        "poolclass": TimedAsyncQueuePool if asyncio else TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800" if remote else "-1")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", remote),
+    }
+
+# Applied to every new SQLite connection. WAL lets readers proceed while a
+# booking is being written; NORMAL sync is durable in WAL mode except on power loss.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # Negative means KiB, i.e. 64 MiB
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+def apply_sqlite_pragmas(engine, read_only: bool = False):
+    # `engine` may be an AsyncEngine; events attach to its sync core
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pragmas = dict(SQLITE_PRAGMAS)
+    if read_only or is_memory_sqlite(str(sync_engine.url)):
+        pragmas.pop("journal_mode")  # WAL needs a file, and is the writer's to set
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def pool_stats(engine) -> Dict[str, Any]:
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats: Dict[str, Any] = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    wait_time = getattr(pool, "wait_time", None)
+    if wait_time is not None:
+        snapshot = wait_time.snapshot()
+        stats["checkouts"] = snapshot["count"]
+        stats["wait_seconds_total"] = round(snapshot["sum"], 6)
+    return stats
@@ -0,0 +1,60 @@
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# In test mode an endpoint that issues more SQL statements than its declared
+# budget raises instead of only logging a warning
+ENFORCE_QUERY_BUDGET = os.getenv("QUERY_BUDGET_ENFORCE", "").lower() in ("1", "true", "yes")
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+# Holds a mutable counter so statements run in threadpool copies of the
+# request context are still recorded on the same object
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+def query_budget(max_queries: int):
+    """Route dependency declaring how many SQL statements the endpoint may issue,
+    including those from other dependencies and response serialization."""
+    async def check_budget(request: Request):
+        with count_queries() as counter:
+            yield
+        if counter.count > max_queries:
+            message = (
+                f"{request.method} {request.url.path} issued {counter.count} queries "
+                f"(budget {max_queries}):\n" + "\n".join(counter.statements)
+            )
+            if ENFORCE_QUERY_BUDGET:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+    return check_budget
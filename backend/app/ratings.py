@@ -0,0 +1,139 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+from sqlmodel import Session, select, func, update, cast, col, Float
+from app.models import ServiceProvider, Booking, BookingStatus, Review
+
+# Ranking score: a Bayesian-smoothed rating (as if every provider also had
+# RANKING_PRIOR_WEIGHT reviews at RANKING_PRIOR_MEAN stars) plus bounded
+# bonuses for review volume, experience and recent bookings. Each bonus
+# saturates as x / (x + k), so the score is plain arithmetic SQL and can be
+# updated in the same atomic UPDATE as the aggregates it depends on.
+RANKING_PRIOR_MEAN = float(os.getenv("RANKING_PRIOR_MEAN", "3.5"))
+RANKING_PRIOR_WEIGHT = float(os.getenv("RANKING_PRIOR_WEIGHT", "10"))
+# Bookings created within this many days count as recent
+RANKING_RECENT_DAYS = int(os.getenv("RANKING_RECENT_DAYS", "30"))
+
+# (weight, half-saturation point) of each bonus
+REVIEW_VOLUME_BONUS = (0.5, 20.0)
+EXPERIENCE_BONUS = (0.3, 5.0)
+RECENT_BOOKINGS_BONUS = (0.4, 10.0)
+
+def _saturating(value, bonus):
+    weight, half = bonus
+    return weight * cast(value, Float) / (value + half)
+
+def score_expression(rating_sum, rating_count, experience, recent_bookings):
+    # Arguments are columns or SQL expressions for the values the score should reflect
+    smoothed = (RANKING_PRIOR_MEAN * RANKING_PRIOR_WEIGHT + rating_sum) / (RANKING_PRIOR_WEIGHT + rating_count)
+    return (
+        smoothed
+        + _saturating(rating_count, REVIEW_VOLUME_BONUS)
+        + _saturating(experience, EXPERIENCE_BONUS)
+        + _saturating(recent_bookings, RECENT_BOOKINGS_BONUS)
+    )
+
+def add_ratings(session: Session, provider_id: int, rating_sum: int, rating_count: int):
+    # Adds reviews to the provider's aggregate in a single UPDATE, so concurrent
+    # writers can't overwrite each other. SET expressions see the pre-update row values.
+    new_sum = ServiceProvider.rating_sum + rating_sum
+    new_count = ServiceProvider.rating_count + rating_count
+    session.exec(
+        update(ServiceProvider)
+        .where(ServiceProvider.id == provider_id)
+        .values(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            rating_avg=cast(new_sum, Float) / new_count,
+            score=score_expression(new_sum, new_count, ServiceProvider.experience, ServiceProvider.recent_bookings),
+        )
+    )
+
+def add_recent_booking(session: Session, provider_id: int, delta: int = 1):
+    # A booking was made (+1) or a recent one cancelled (-1); caller commits
+    recent = ServiceProvider.recent_bookings + delta
+    session.exec(
+        update(ServiceProvider)
+        .where(ServiceProvider.id == provider_id)
+        .values(
+            recent_bookings=recent,
+            score=score_expression(ServiceProvider.rating_sum, ServiceProvider.rating_count, ServiceProvider.experience, recent),
+        )
+    )
+
+def is_recent(booking: Booking) -> bool:
+    created_at = booking.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at >= datetime.now(timezone.utc) - timedelta(days=RANKING_RECENT_DAYS)
+
+def refresh_score(session: Session, provider_id: int):
+    session.exec(
+        update(ServiceProvider)
+        .where(ServiceProvider.id == provider_id)
+        .values(score=score_expression(
+            ServiceProvider.rating_sum, ServiceProvider.rating_count, ServiceProvider.experience, ServiceProvider.recent_bookings
+        ))
+    )
+
+def _rating_values():
+    # SET values that rebuild each provider's rating aggregate from Review
+    provider_reviews = (
+        select(Review.rating).join(Booking).where(Booking.provider_id == ServiceProvider.id).correlate(ServiceProvider)
+    )
+    rating_sum = func.coalesce(
+        provider_reviews.with_only_columns(func.sum(Review.rating)).scalar_subquery(), 0
+    )
+    rating_count = provider_reviews.with_only_columns(func.count(Review.id)).scalar_subquery()
+    return {
+        "rating_sum": rating_sum,
+        "rating_count": rating_count,
+        "rating_avg": func.coalesce(cast(rating_sum, Float) / func.nullif(rating_count, 0), 0.0),
+    }
+
+def refresh_ratings(session: Session, provider_ids: Iterable[int]):
+    # Recounts the given providers' ratings from Review and rescores them in one
+    # UPDATE, O(reviews); a repair path, reviews normally go through add_ratings. Caller commits
+    values = _rating_values()
+    session.exec(
+        update(ServiceProvider)
+        .where(col(ServiceProvider.id).in_(list(provider_ids)))
+        .values(**values, score=score_expression(
+            values["rating_sum"], values["rating_count"], ServiceProvider.experience, ServiceProvider.recent_bookings
+        ))
+    )
+
+def recompute_ratings(session: Session):
+    # Rebuilds every provider's aggregate from Review in one set-based UPDATE
+    result = session.exec(update(ServiceProvider).values(**_rating_values()))
+    session.commit()
+    return result.rowcount
+
+def recompute_scores(session: Session):
+    # Recounts recent bookings and rescores every provider. Run periodically
+    # (python -m app.ratings) so bookings that age out of the window stop counting.
+    since = datetime.now(timezone.utc) - timedelta(days=RANKING_RECENT_DAYS)
+    recent = (
+        select(func.count(Booking.id))
+        .where(
+            Booking.provider_id == ServiceProvider.id,
+            Booking.created_at >= since,
+            Booking.status != BookingStatus.CANCELLED,
+        )
+        .correlate(ServiceProvider)
+        .scalar_subquery()
+    )
+    session.exec(update(ServiceProvider).values(recent_bookings=recent))
+    session.exec(update(ServiceProvider).values(score=score_expression(
+        ServiceProvider.rating_sum, ServiceProvider.rating_count, ServiceProvider.experience, ServiceProvider.recent_bookings
+    )))
+    session.commit()
+
+if __name__ == "__main__":
+    # One-off backfill / repair: python -m app.ratings
+    from app.database import engine, create_db_and_tables
+    create_db_and_tables()
+    with Session(engine) as session:
+        count = recompute_ratings(session)
+        recompute_scores(session)
+    print(f"Recomputed ratings and ranking scores for {count} providers.")
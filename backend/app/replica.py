@@ -0,0 +1,36 @@
+import argparse
+import sqlite3
+import time
+from sqlalchemy.engine import make_url
+from app.database import DATABASE_URL, READ_DATABASE_URL
+
+# Stands in for replication when the "replica" is a second SQLite file: copies
+# the primary into it with the online backup API, once or every --interval
+# seconds, so reads lag writes the way they would on a real replica.
+
+def sqlite_path(url: str) -> str:
+    if not url.startswith("sqlite"):
+        raise SystemExit(f"Not a SQLite database: {make_url(url).render_as_string()}")
+    return make_url(url).database
+
+def sync_replica():
+    source = sqlite3.connect(sqlite_path(DATABASE_URL))
+    target = sqlite3.connect(sqlite_path(READ_DATABASE_URL))
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy the SQLite primary into the READ_DATABASE_URL file.")
+    parser.add_argument("--interval", type=float, default=0, help="keep syncing every N seconds")
+    args = parser.parse_args()
+    if not READ_DATABASE_URL:
+        raise SystemExit("READ_DATABASE_URL is not set")
+    while True:
+        sync_replica()
+        print(f"Synced replica at {time.strftime('%H:%M:%S')}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,207 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+# Budget for cached response bodies, per worker
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Upper bound on staleness; invalidation only reaches the worker that did the write
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+# Clients may keep a copy but must revalidate it (cheap with If-None-Match)
+RESPONSE_CACHE_CONTROL = os.getenv("RESPONSE_CACHE_CONTROL", "public, no-cache")
+
+class CachedResponse:
+    __slots__ = ("body", "headers", "etag", "tags", "expires")
+
+    def __init__(self, body: bytes, headers: List[Tuple[bytes, bytes]], etag: str, tags: Set[str], expires: float):
+        self.body = body
+        self.headers = headers
+        self.etag = etag
+        self.tags = tags
+        self.expires = expires
+
+class ResponseCache:
+    """Byte-bounded LRU of serialized GET responses, invalidated by tag."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        # Bumped on invalidation so a response computed before a write is not stored after it
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in sorted(tags))
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: str, entry: CachedResponse, generation: Tuple[int, ...]):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if tuple(self._generations.get(tag, 0) for tag in sorted(entry.tags)) != generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.bytes += size
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.bytes -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS)
+
+# Cache tags; writers invalidate the same names
+def providers_tag() -> str:
+    return "providers"
+
+def provider_tag(provider_id: int) -> str:
+    return f"provider:{provider_id}"
+
+def reviews_tag(provider_id: int) -> str:
+    return f"reviews:{provider_id}"
+
+# Cacheable public routes: path pattern -> tags for a matching path
+CACHE_RULES: List[Tuple[Pattern, Callable[[re.Match], Set[str]]]] = [
+    (re.compile(r"^/providers/?$"), lambda m: {providers_tag()}),
+    (re.compile(r"^/providers/(\d+)$"), lambda m: {provider_tag(int(m.group(1)))}),
+    (re.compile(r"^/reviews/provider/(\d+)$"), lambda m: {reviews_tag(int(m.group(1)))}),
+]
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+class ResponseCacheMiddleware:
+    """Serves cacheable GETs from `response_cache`, with ETag / If-None-Match support."""
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        tags = None
+        for pattern, tag_fn in CACHE_RULES:
+            match = pattern.match(scope["path"])
+            if match:
+                tags = tag_fn(match)
+                break
+        if tags is None:
+            return await self.app(scope, receive, send)
+
+        query = urlencode(sorted(parse_qsl(scope["query_string"].decode(), keep_blank_values=True)))
+        key = f"{scope['path'].rstrip('/')}?{query}"
+        request_headers = {k.decode().lower(): v.decode() for k, v in scope["headers"]}
+        if_none_match = request_headers.get("if-none-match")
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            return await self._send_cached(send, entry, if_none_match, b"HIT")
+
+        generation = self.cache.generation(tags)
+        # Shared with the request, so get_async_session can flag replica reads
+        state = scope.setdefault("state", {})
+        start: dict = {}
+        chunks: List[bytes] = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+
+        body = b"".join(chunks)
+        if start.get("status") != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in (b"content-length", b"etag")]
+        entry = CachedResponse(body, headers, etag, tags, time.monotonic() + self.cache.ttl)
+        if state.get("replica_read"):
+            # A replica may lag a write that already invalidated this key; storing
+            # its answer would serve that stale copy to everyone for the full TTL
+            return await self._send_cached(send, entry, if_none_match, b"BYPASS")
+        self.cache.set(key, entry, generation)
+        await self._send_cached(send, entry, if_none_match, b"MISS")
+
+    async def _send_cached(self, send, entry: CachedResponse, if_none_match: Optional[str], status: bytes):
+        headers = list(entry.headers) + [
+            (b"etag", entry.etag.encode()),
+            (b"cache-control", RESPONSE_CACHE_CONTROL.encode()),
+            (b"x-cache", status),
+        ]
+        if _etag_matches(if_none_match, entry.etag):
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers.append((b"content-length", str(len(entry.body)).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
@@ -0,0 +1,84 @@
+from datetime import date
+from typing import List, Optional
+from sqlmodel import Session, select, func, delete, cast, Date
+from app.models import (
+    Booking, BookingStatus, ServiceProvider, ProviderCategoryLink,
+    CategoryBookingRollup, PincodeBookingRollup,
+)
+
+def _upsert(session: Session):
+    from sqlalchemy.dialects import postgresql, sqlite
+    return postgresql.insert if session.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+def _bump(session: Session, model, values: dict, delta: int):
+    insert = _upsert(session)
+    keys = [c.name for c in model.__table__.primary_key.columns]
+    session.exec(
+        insert(model)
+        .values(**values, count=delta)
+        .on_conflict_do_update(index_elements=keys, set_={"count": model.count + delta})
+    )
+
+def _adjust(session: Session, day: date, category_ids: List[int], pincode: str, status: BookingStatus, delta: int):
+    for category_id in category_ids:
+        _bump(session, CategoryBookingRollup, {"day": day, "category_id": category_id, "status": status}, delta)
+    _bump(session, PincodeBookingRollup, {"day": day, "pincode": pincode, "status": status}, delta)
+
+def record_booking(session: Session, booking: Booking, old_status: Optional[BookingStatus] = None):
+    """Counts a new booking, or moves it between statuses when `old_status` is given.
+    Runs in the caller's transaction."""
+    if old_status == booking.status:
+        return
+    provider = session.get(ServiceProvider, booking.provider_id)
+    category_ids = session.exec(
+        select(ProviderCategoryLink.category_id).where(ProviderCategoryLink.provider_id == booking.provider_id)
+    ).all()
+    day = booking.created_at.date()
+    if old_status is not None:
+        _adjust(session, day, category_ids, provider.location_pincode, old_status, -1)
+    _adjust(session, day, category_ids, provider.location_pincode, booking.status, 1)
+
+def booking_day(session: Session):
+    # SQLite has no real DATE type; date() yields the same 'YYYY-MM-DD' text the ORM stores
+    if session.get_bind().dialect.name == "sqlite":
+        return func.date(Booking.created_at)
+    return cast(Booking.created_at, Date)
+
+def rebuild_rollups(session: Session):
+    # Recomputes both rollups from Booking in two INSERT ... SELECT statements
+    day = booking_day(session)
+    session.exec(delete(CategoryBookingRollup))
+    session.exec(delete(PincodeBookingRollup))
+    session.exec(
+        CategoryBookingRollup.__table__.insert().from_select(
+            ["day", "category_id", "status", "count"],
+            select(day, ProviderCategoryLink.category_id, Booking.status, func.count(Booking.id))
+            .join(ProviderCategoryLink, ProviderCategoryLink.provider_id == Booking.provider_id)
+            .group_by(day, ProviderCategoryLink.category_id, Booking.status),
+        )
+    )
+    session.exec(
+        PincodeBookingRollup.__table__.insert().from_select(
+            ["day", "pincode", "status", "count"],
+            select(day, ServiceProvider.location_pincode, Booking.status, func.count(Booking.id))
+            .join(ServiceProvider, ServiceProvider.id == Booking.provider_id)
+            .group_by(day, ServiceProvider.location_pincode, Booking.status),
+        )
+    )
+    session.commit()
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return date.fromordinal(day.toordinal() - day.weekday())  # Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+if __name__ == "__main__":
+    # Rebuild analytics rollups from raw bookings: python -m app.rollups
+    from app.database import engine, create_db_and_tables
+    create_db_and_tables()
+    with Session(engine) as session:
+        rebuild_rollups(session)
+        total = session.exec(select(func.coalesce(func.sum(PincodeBookingRollup.count), 0))).one()
+    print(f"Rebuilt analytics rollups covering {total} bookings.")
@@ -1,29 +1,62 @@
-from typing import List, Dict
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, func, col, desc
-from app.database import get_session
-from app.models import User, ServiceProvider, Booking, BookingStatus, AdminLog
-from app.schemas import ProviderRead
+from datetime import date, datetime, timezone
+from typing import List, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import joinedload
+from sqlmodel import select, func, col, desc, update, insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
+from app.models import (
+    User, ServiceProvider, BookingStatus, AdminLog, ServiceCategory,
+    CategoryBookingRollup, PincodeBookingRollup,
+)
+from app.schemas import ProviderPage, BulkVerifyRequest, BulkVerifyResponse, MAX_BULK_VERIFY
 from app.auth import get_current_admin
+from app.querybudget import query_budget
+from app.rollups import period_start
+from app.exports import export_statement, stream_export
+from app.jobs import enqueue
+from app.categories import category_filter
+from app.pagination import (
+    encode_cursor, decode_cursor, keyset_after, order_by_keys, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
+from app.responsecache import response_cache, providers_tag, provider_tag
 
 router = APIRouter()
 
-@router.get("/unverified-providers", response_model=List[ProviderRead])
-def get_unverified_providers(
+@router.get("/unverified-providers", response_model=ProviderPage, dependencies=[Depends(query_budget(3))])
+async def get_unverified_providers(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
     admin: User = Depends(get_current_admin),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    providers = session.exec(select(ServiceProvider).where(ServiceProvider.verified == False)).all()
-    return providers
+    # Oldest registrations first
+    statement = select(ServiceProvider).where(ServiceProvider.verified == False)
+    total = None
+    if include_total:
+        total = (await session.exec(select(func.count()).select_from(statement.subquery()))).one()
+
+    keys = [(ServiceProvider.id, False)]
+    last = decode_cursor(cursor, [int])
+    if last:
+        statement = statement.where(keyset_after(keys, last))
+    statement = statement.order_by(*order_by_keys(keys)).options(joinedload(ServiceProvider.user))
+
+    results = (await session.exec(statement.limit(limit + 1))).all()
+    items = results[:limit]
+    next_cursor = encode_cursor(items[-1].id) if len(results) > limit else None
+    return {"items": items, "next_cursor": next_cursor, "total": total}
 
 @router.post("/verify-provider/{provider_id}")
-def verify_provider(
+async def verify_provider(
     provider_id: int,
     approve: bool,
     admin: User = Depends(get_current_admin),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    provider = session.get(ServiceProvider, provider_id)
+    provider = await session.get(ServiceProvider, provider_id)
     if not provider:
         raise HTTPException(status_code=404, detail="Provider not found")
 
@@ -34,37 +67,159 @@ def verify_provider(
         # If rejected, we keep verified=False
         action = f"Rejected provider {provider_id}"
 
-    log = AdminLog(action=action, admin_id=admin.id, target_user_id=provider.user_id)
     session.add(provider)
-    session.add(log)
-    session.commit()
+    # The audit entry is written by the job worker, stamped with the time of the decision
+    enqueue(session, "admin_log", {
+        "action": action,
+        "admin_id": admin.id,
+        "target_user_id": provider.user_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    })
+    await session.commit()
+    response_cache.invalidate(provider_tag(provider_id), providers_tag())
     return {"message": action}
 
+@router.post("/verify-providers", response_model=BulkVerifyResponse)
+async def verify_providers(
+    request: BulkVerifyRequest,
+    admin: User = Depends(get_current_admin),
+    session: AsyncSession = Depends(get_async_session)
+):
+    # One transaction: a set-based UPDATE plus one multi-row AdminLog insert
+    statement = select(ServiceProvider.id, ServiceProvider.user_id, ServiceProvider.verified)
+    if request.provider_ids:
+        wanted = list(dict.fromkeys(request.provider_ids))
+        statement = statement.where(col(ServiceProvider.id).in_(wanted))
+    elif request.pincode or request.category:
+        statement = statement.where(ServiceProvider.verified == False)
+        if request.pincode:
+            statement = statement.where(ServiceProvider.location_pincode == request.pincode)
+        if request.category:
+            statement = statement.where(category_filter([request.category]))
+        statement = statement.order_by(ServiceProvider.id).limit(MAX_BULK_VERIFY + 1)
+    else:
+        raise HTTPException(status_code=400, detail="Provide provider_ids or a pincode/category filter")
+
+    found = (await session.exec(statement)).all()
+    has_more = not request.provider_ids and len(found) > MAX_BULK_VERIFY
+    found = found[:MAX_BULK_VERIFY]
+    if not request.provider_ids:
+        wanted = [provider_id for provider_id, _, _ in found]
+    user_ids = {provider_id: user_id for provider_id, user_id, _ in found}
+
+    if request.approve:
+        # Guarded on verified so concurrent approvals are not logged twice
+        pending = [provider_id for provider_id, _, verified in found if not verified]
+        changed = set()
+        if pending:
+            changed = set((await session.exec(
+                update(ServiceProvider)
+                .where(col(ServiceProvider.id).in_(pending), ServiceProvider.verified == False)
+                .values(verified=True)
+                .returning(ServiceProvider.id)
+            )).scalars().all())
+        outcomes = {p: "approved" if p in changed else "already_verified" for p in user_ids}
+        verb = "Approved"
+    else:
+        # As with a single rejection, the provider simply stays unverified; a
+        # rejection does not revoke an approval, so verified ones are reported as such
+        outcomes = {p: "already_verified" if verified else "rejected" for p, _, verified in found}
+        verb = "Rejected"
+
+    now = datetime.now(timezone.utc)
+    logs = [
+        {"action": f"{verb} provider {p}", "admin_id": admin.id, "target_user_id": user_ids[p], "timestamp": now}
+        for p, outcome in outcomes.items() if outcome in ("approved", "rejected")
+    ]
+    if logs:
+        await session.exec(insert(AdminLog), params=logs)
+    await session.commit()
+    if request.approve and changed:
+        response_cache.invalidate(providers_tag(), *(provider_tag(p) for p in changed))
+
+    results = [{"provider_id": p, "outcome": outcomes.get(p, "not_found")} for p in wanted]
+    return {"results": results, "has_more": has_more}
+
 @router.get("/analytics")
-def get_analytics(
+async def get_analytics(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[BookingStatus] = None,
+    granularity: Optional[str] = Query(None, pattern="^(day|week|month)$"),
     admin: User = Depends(get_current_admin),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    # Most booked services
-    # Simplified version: count bookings per service string
-    top_services = session.exec(
-        select(ServiceProvider.services, func.count(Booking.id).label("booking_count"))
-        .join(Booking)
-        .group_by(ServiceProvider.services)
+    # Served entirely from the booking rollups (see app.rollups)
+    def filtered(statement, rollup):
+        if start_date:
+            statement = statement.where(rollup.day >= start_date)
+        if end_date:
+            statement = statement.where(rollup.day <= end_date)
+        if status:
+            statement = statement.where(rollup.status == status)
+        return statement
+
+    # Most booked services, counted per category (a multi-service provider counts for each)
+    booking_count = func.sum(CategoryBookingRollup.count).label("booking_count")
+    top_services = (await session.exec(
+        filtered(select(ServiceCategory.name, booking_count), CategoryBookingRollup)
+        .join(ServiceCategory, ServiceCategory.id == CategoryBookingRollup.category_id)
+        .group_by(ServiceCategory.id, ServiceCategory.name)
+        .having(booking_count > 0)
         .order_by(desc("booking_count"))
         .limit(5)
-    ).all()
+    )).all()
 
     # Popular locations
-    popular_locations = session.exec(
-        select(ServiceProvider.location_pincode, func.count(Booking.id).label("booking_count"))
-        .join(Booking)
-        .group_by(ServiceProvider.location_pincode)
+    booking_count = func.sum(PincodeBookingRollup.count).label("booking_count")
+    popular_locations = (await session.exec(
+        filtered(select(PincodeBookingRollup.pincode, booking_count), PincodeBookingRollup)
+        .group_by(PincodeBookingRollup.pincode)
+        .having(booking_count > 0)
         .order_by(desc("booking_count"))
         .limit(5)
-    ).all()
+    )).all()
 
-    return {
-        "top_services": [{"services": s, "count": c} for s, c in top_services],
+    result = {
+        "top_services": [{"category": s, "count": c} for s, c in top_services],
         "popular_locations": [{"pincode": p, "count": c} for p, c in popular_locations]
     }
+
+    if granularity:
+        daily = (await session.exec(
+            filtered(select(PincodeBookingRollup.day, func.sum(PincodeBookingRollup.count)), PincodeBookingRollup)
+            .group_by(PincodeBookingRollup.day)
+            .order_by(PincodeBookingRollup.day)
+        )).all()
+        periods: Dict[date, int] = {}
+        for day, count in daily:
+            period = period_start(day, granularity)
+            periods[period] = periods.get(period, 0) + count
+        result["bookings_over_time"] = [{"period": p, "count": c} for p, c in periods.items()]
+
+    return result
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+@router.get("/export/{dataset}")
+async def export_data(
+    dataset: str = Path(..., pattern="^(bookings|providers|reviews)$"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[BookingStatus] = None,
+    verified: Optional[bool] = None,
+    after_id: Optional[int] = None,
+    admin: User = Depends(get_current_admin),
+):
+    # Streams the whole (filtered) table in constant memory, ordered by id
+    if status is not None and dataset != "bookings":
+        raise HTTPException(status_code=400, detail="status only applies to bookings")
+    if verified is not None and dataset != "providers":
+        raise HTTPException(status_code=400, detail="verified only applies to providers")
+    statement = export_statement(dataset, start_date, end_date, status, verified, after_id)
+    return StreamingResponse(
+        stream_export(statement, dataset, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
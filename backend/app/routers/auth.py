@@ -1,21 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
-from app.database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models import User
 from app.schemas import UserCreate, Token, UserRead
-from app.auth import get_password_hash, verify_password, create_access_token
+from app.auth import aget_password_hash, averify_and_update_password, create_access_token
+from app.admission import limiter, limit_by_ip, AUTH_IP_RATE, LOGIN_ACCOUNT_RATE
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserRead)
-def register(user_data: UserCreate, session: Session = Depends(get_session)):
+@router.post("/register", response_model=UserRead, dependencies=[Depends(limit_by_ip("auth", AUTH_IP_RATE))])
+async def register(user_data: UserCreate, session: AsyncSession = Depends(get_async_session)):
     # Check if user exists
-    existing_user = session.exec(select(User).where(User.email == user_data.email)).first()
+    existing_user = (await session.exec(select(User).where(User.email == user_data.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pwd = get_password_hash(user_data.password)
+    hashed_pwd = await aget_password_hash(user_data.password)
     new_user = User(
         name=user_data.name,
         email=user_data.email,
@@ -23,19 +26,32 @@ def register(user_data: UserCreate, session: Session = Depends(get_session)):
         role=user_data.role
     )
     session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    await session.commit()
+    await session.refresh(new_user)
     return new_user
 
-@router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.email == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+@router.post("/login", response_model=Token, dependencies=[Depends(limit_by_ip("auth", AUTH_IP_RATE))])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_async_session)):
+    # Failed attempts are also counted per account, so one address can't be guessed
+    # from many IPs; once they are used up, attempts are refused before any bcrypt work
+    account = form_data.username.lower()
+    await run_in_threadpool(limiter.require, "login", "account", account, LOGIN_ACCOUNT_RATE)
+    user = (await session.exec(select(User).where(User.email == form_data.username))).first()
+    if user:
+        valid, new_hash = await averify_and_update_password(form_data.password, user.password_hash)
+    if not user or not valid:
+        await run_in_threadpool(limiter.charge, "login", "account", account, LOGIN_ACCOUNT_RATE)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Transparently upgrade hashes made with an outdated bcrypt cost
+    if new_hash:
+        user.password_hash = new_hash
+        session.add(user)
+        await session.commit()
+
     access_token = create_access_token(data={"sub": user.email})
     return {"access_token": access_token, "token_type": "bearer", "role": user.role}
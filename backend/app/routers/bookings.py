@@ -1,64 +1,135 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.database import get_session
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import joinedload
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models import User, ServiceProvider, Booking, UserRole, BookingStatus
-from app.schemas import BookingCreate, BookingRead
+from app.schemas import BookingCreate, BookingRead, BookingPage, BookingSummary
 from app.auth import get_current_user
+from app.querybudget import query_budget
+from app.rollups import record_booking
+from app.ratings import add_recent_booking, is_recent
+from app.responsecache import response_cache, provider_tag
+from app.availability import to_utc, reserve_slot, reactivate_slot
+from app.pagination import (
+    encode_cursor, decode_cursor, cursor_datetime, keyset_after, order_by_keys, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
 
 router = APIRouter()
 
+# Everything BookingRead serializes, loaded alongside the booking rows
+BOOKING_READ_OPTIONS = [
+    joinedload(Booking.customer),
+    joinedload(Booking.provider).joinedload(ServiceProvider.user),
+]
+
+async def load_booking_for_read(session: AsyncSession, booking_id: int) -> Booking:
+    return await session.get(Booking, booking_id, options=BOOKING_READ_OPTIONS, populate_existing=True)
+
 @router.post("/", response_model=BookingRead)
-def create_booking(
+async def create_booking(
     booking_data: BookingCreate,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    provider = session.get(ServiceProvider, booking_data.provider_id)
+    provider = await session.get(ServiceProvider, booking_data.provider_id)
     if not provider:
         raise HTTPException(status_code=404, detail="Provider not found")
 
+    start = to_utc(booking_data.date_time)
+    end = start + timedelta(minutes=booking_data.duration_minutes)
+    # Locks the provider's schedule until commit, then rejects overlaps
+    await session.run_sync(reserve_slot, provider, start, end)
+
     new_booking = Booking(
         user_id=current_user.id,
         provider_id=booking_data.provider_id,
-        date_time=booking_data.date_time
+        date_time=start,
+        duration_minutes=booking_data.duration_minutes,
+        end_time=end
     )
     session.add(new_booking)
-    session.commit()
-    session.refresh(new_booking)
-    return new_booking
+    await session.run_sync(record_booking, new_booking)
+    await session.run_sync(add_recent_booking, new_booking.provider_id)
+    await session.commit()
+    # The provider's score counts recent bookings; list pages pick it up within the cache TTL
+    response_cache.invalidate(provider_tag(new_booking.provider_id))
+    return await load_booking_for_read(session, new_booking.id)
 
-@router.get("/my-bookings", response_model=List[BookingRead])
-def get_my_bookings(
+async def owner_clause(session: AsyncSession, user: User):
+    # Bookings the user made, or for a provider, bookings made with them; None if they have no profile yet
+    if user.role == UserRole.PROVIDER:
+        provider_id = (await session.exec(select(ServiceProvider.id).where(ServiceProvider.user_id == user.id))).first()
+        return Booking.provider_id == provider_id if provider_id is not None else None
+    return Booking.user_id == user.id
+
+@router.get("/my-bookings", response_model=BookingPage, dependencies=[Depends(query_budget(4))])
+async def get_my_bookings(
+    status: Optional[BookingStatus] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    if current_user.role == UserRole.PROVIDER:
-        provider = session.exec(select(ServiceProvider).where(ServiceProvider.user_id == current_user.id)).first()
-        if not provider:
-            return []
-        statement = select(Booking).where(Booking.provider_id == provider.id)
-    else:
-        statement = select(Booking).where(Booking.user_id == current_user.id)
+    owner = await owner_clause(session, current_user)
+    if owner is None:
+        return {"items": [], "next_cursor": None, "total": 0 if include_total else None}
 
-    results = session.exec(statement).all()
-    return results
+    # Latest first; a seek on ix_booking_user_id_date_time / ix_booking_provider_id_date_time
+    statement = select(Booking).where(owner)
+    if status:
+        statement = statement.where(Booking.status == status)
+    if start_date:
+        statement = statement.where(Booking.date_time >= to_utc(start_date))
+    if end_date:
+        statement = statement.where(Booking.date_time < to_utc(end_date))
+    total = None
+    if include_total:
+        total = (await session.exec(select(func.count()).select_from(statement.subquery()))).one()
+
+    keys = [(Booking.date_time, True), (Booking.id, True)]
+    last = decode_cursor(cursor, [cursor_datetime, int])
+    if last:
+        statement = statement.where(keyset_after(keys, last))
+    statement = statement.order_by(*order_by_keys(keys)).options(*BOOKING_READ_OPTIONS)
+
+    results = (await session.exec(statement.limit(limit + 1))).all()
+    items = results[:limit]
+    next_cursor = encode_cursor(items[-1].date_time.isoformat(), items[-1].id) if len(results) > limit else None
+    return {"items": items, "next_cursor": next_cursor, "total": total}
+
+@router.get("/summary", response_model=BookingSummary, dependencies=[Depends(query_budget(3))])
+async def get_booking_summary(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    counts = {booking_status: 0 for booking_status in BookingStatus}
+    owner = await owner_clause(session, current_user)
+    if owner is not None:
+        rows = (await session.exec(select(Booking.status, func.count()).where(owner).group_by(Booking.status))).all()
+        counts.update(dict(rows))
+    return {"counts": counts, "total": sum(counts.values())}
 
 @router.patch("/{booking_id}/status", response_model=BookingRead)
-def update_booking_status(
+async def update_booking_status(
     booking_id: int,
     status: BookingStatus,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    booking = session.get(Booking, booking_id)
+    booking = await session.get(Booking, booking_id, options=BOOKING_READ_OPTIONS)
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
     # Check permissions
     # Provider can complete/cancel
     # Customer can cancel
-    provider = session.get(ServiceProvider, booking.provider_id)
+    provider = booking.provider
 
     if current_user.role == UserRole.PROVIDER:
         if provider.user_id != current_user.id:
@@ -69,8 +140,19 @@ def update_booking_status(
         if status == BookingStatus.COMPLETED:
              raise HTTPException(status_code=403, detail="Only provider can mark as completed")
 
+    old_status = booking.status
+    if status == BookingStatus.PENDING and old_status != BookingStatus.PENDING:
+        # Back to an active booking: the slot may have been taken meanwhile
+        await session.run_sync(reactivate_slot, booking)
     booking.status = status
     session.add(booking)
-    session.commit()
-    session.refresh(booking)
-    return booking
+    await session.run_sync(record_booking, booking, old_status)
+    # Cancelled bookings do not count towards the provider's recent volume
+    cancelled = status == BookingStatus.CANCELLED
+    rescored = cancelled != (old_status == BookingStatus.CANCELLED) and is_recent(booking)
+    if rescored:
+        await session.run_sync(add_recent_booking, booking.provider_id, -1 if cancelled else 1)
+    await session.commit()
+    if rescored:
+        response_cache.invalidate(provider_tag(booking.provider_id))
+    return await load_booking_for_read(session, booking.id)
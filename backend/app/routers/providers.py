@@ -1,24 +1,41 @@
+from datetime import date, datetime, timedelta, timezone
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, col, or_, desc
-from app.database import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import joinedload
+from sqlmodel import select, col, func, case
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models import User, ServiceProvider, UserRole
-from app.schemas import ProviderCreate, ProviderRead
+from app.schemas import ProviderCreate, ProviderRead, ProviderPage, AvailabilitySlot
 from app.auth import get_current_user
+from app.categories import sync_provider_categories, category_filter
+from app.geo import pincode_index
+from app.search import search_terms, search_matches, index_provider
+from app.ratings import refresh_score
+from app.availability import (
+    SERVICE_TIMEZONE, MIN_BOOKING_MINUTES, MAX_BOOKING_MINUTES, MAX_AVAILABILITY_DAYS,
+    busy_intervals, free_slots,
+)
+from app.querybudget import query_budget
+from app.admission import limit_by_ip, SEARCH_IP_RATE
+from app.responsecache import response_cache, providers_tag
+from app.pagination import (
+    encode_cursor, decode_cursor, keyset_after, order_by_keys, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
 
 router = APIRouter()
 
 @router.post("/register", response_model=ProviderRead)
-def register_provider(
+async def register_provider(
     provider_data: ProviderCreate,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     if current_user.role != UserRole.PROVIDER:
         raise HTTPException(status_code=403, detail="Only users with PROVIDER role can register as service provider")
 
     # Check if already registered
-    existing = session.exec(select(ServiceProvider).where(ServiceProvider.user_id == current_user.id)).first()
+    existing = (await session.exec(select(ServiceProvider).where(ServiceProvider.user_id == current_user.id))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Provider profile already exists")
 
@@ -28,40 +45,166 @@ def register_provider(
         experience=provider_data.experience,
         contact_info=provider_data.contact_info,
         location_pincode=provider_data.location_pincode,
-        profile_picture=provider_data.profile_picture
+        profile_picture=provider_data.profile_picture,
+        work_start=provider_data.work_start,
+        work_end=provider_data.work_end,
+        working_days=provider_data.working_days
     )
     session.add(new_provider)
-    session.commit()
-    session.refresh(new_provider)
+    await session.run_sync(sync_provider_categories, new_provider)
+    await session.run_sync(index_provider, new_provider.id)
+    await session.run_sync(refresh_score, new_provider.id)
+    await session.commit()
+    response_cache.invalidate(providers_tag())
+    await session.refresh(new_provider, ["user", "score"])
     return new_provider
 
-@router.get("/", response_model=List[ProviderRead])
-def get_providers(
+# Sort keys usable for keyset pagination
+SORT_COLUMNS = {
+    "score": ServiceProvider.score,
+    "rating": ServiceProvider.rating_avg,
+    "experience": ServiceProvider.experience,
+}
+SORT_COLUMN_TYPES = {"score": float, "rating": float, "experience": int}
+
+@router.get("/", response_model=ProviderPage, dependencies=[Depends(limit_by_ip("search", SEARCH_IP_RATE)), Depends(query_budget(2))])
+async def get_providers(
     category: Optional[str] = None,
+    categories: Optional[List[str]] = Query(None),
+    match: str = Query("any", pattern="^(any|all)$"),
     pincode: Optional[str] = None,
+    radius_km: Optional[float] = Query(None, gt=0, le=100),
     verified_only: bool = True,
-    sort_by: Optional[str] = "rating", # rating, experience
-    session: Session = Depends(get_session)
+    sort_by: Optional[str] = "rating", # score, rating, experience
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    q: Optional[str] = Query(None, max_length=200),
+    session: AsyncSession = Depends(get_async_session)
 ):
     statement = select(ServiceProvider)
+    matches = None
+    if q:
+        terms = search_terms(q)
+        if not terms:
+            raise HTTPException(status_code=400, detail="Search text has no words to match")
+        # Driven by the full-text index; the other filters apply to its matches
+        matches = search_matches(session.bind, terms)
+        statement = select(ServiceProvider, matches.c.rank).join(matches, matches.c.provider_id == ServiceProvider.id)
     if verified_only:
         statement = statement.where(ServiceProvider.verified == True)
-    if pincode:
+
+    distances = None
+    if radius_km is not None:
+        if not pincode:
+            raise HTTPException(status_code=400, detail="radius_km requires a pincode")
+        # Unknown pincodes have no centroid, so only the exact pincode can match
+        nearby = pincode_index.nearby(pincode, radius_km) or [(pincode, 0.0)]
+        distances = dict(nearby)
+        statement = statement.where(col(ServiceProvider.location_pincode).in_(list(distances)))
+    elif pincode:
         statement = statement.where(ServiceProvider.location_pincode == pincode)
-    if category:
-        statement = statement.where(col(ServiceProvider.services).ilike(f"%{category}%"))
 
-    if sort_by == "rating":
-        statement = statement.order_by(desc(ServiceProvider.rating_avg))
-    elif sort_by == "experience":
-        statement = statement.order_by(desc(ServiceProvider.experience))
+    wanted = (categories or []) + ([category] if category else [])
+    if wanted:
+        statement = statement.where(category_filter(wanted, match_all=(match == "all")))
+
+    total = None
+    if include_total:
+        total = (await session.exec(select(func.count()).select_from(statement.subquery()))).one()
+
+    # (column, descending) pairs; `id` last so the order is total. `types`
+    # converts the matching cursor values back.
+    if matches is not None:
+        keys = [(matches.c.rank, False), (ServiceProvider.id, True)]
+        types = [float, int]
+    elif distances is not None:
+        distance = case(distances, value=ServiceProvider.location_pincode)
+        keys = [(distance, False), (ServiceProvider.rating_avg, True), (ServiceProvider.id, True)]
+        types = [float, float, int]
+    elif sort_by in SORT_COLUMNS:
+        keys = [(SORT_COLUMNS[sort_by], True), (ServiceProvider.id, True)]
+        types = [SORT_COLUMN_TYPES[sort_by], int]
+    else:
+        keys = [(ServiceProvider.id, False)]
+        types = [int]
+
+    last = decode_cursor(cursor, types)
+    if last:
+        statement = statement.where(keyset_after(keys, last))
+    statement = statement.order_by(*order_by_keys(keys)).options(joinedload(ServiceProvider.user))
 
-    results = session.exec(statement).all()
-    return results
+    # Fetch one extra row to know whether another page exists
+    results = (await session.exec(statement.limit(limit + 1))).all()
+    items = results[:limit]
+    ranks = {}
+    if matches is not None:
+        ranks = {p.id: rank for p, rank in items}
+        items = [p for p, _ in items]
+
+    next_cursor = None
+    if len(results) > limit:
+        tail = items[-1]
+        if matches is not None:
+            next_cursor = encode_cursor(ranks[tail.id], tail.id)
+        elif distances is not None:
+            next_cursor = encode_cursor(distances[tail.location_pincode], tail.rating_avg, tail.id)
+        elif sort_by in SORT_COLUMNS:
+            next_cursor = encode_cursor(getattr(tail, SORT_COLUMNS[sort_by].key), tail.id)
+        else:
+            next_cursor = encode_cursor(tail.id)
+
+    if distances is not None:
+        items = [
+            ProviderRead.model_validate(p).model_copy(update={"distance_km": distances[p.location_pincode]})
+            for p in items
+        ]
+    return {"items": items, "next_cursor": next_cursor, "total": total}
+
+@router.get("/me", response_model=ProviderRead, dependencies=[Depends(query_budget(2))])
+async def get_my_provider(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    # The caller's own profile, verified or not
+    statement = select(ServiceProvider).where(ServiceProvider.user_id == current_user.id)
+    provider = (await session.exec(statement.options(joinedload(ServiceProvider.user)))).first()
+    if not provider:
+        raise HTTPException(status_code=404, detail="Provider profile not found")
+    return provider
 
-@router.get("/{provider_id}", response_model=ProviderRead)
-def get_provider_detail(provider_id: int, session: Session = Depends(get_session)):
-    provider = session.get(ServiceProvider, provider_id)
+@router.get("/{provider_id}", response_model=ProviderRead, dependencies=[Depends(query_budget(1))])
+async def get_provider_detail(provider_id: int, session: AsyncSession = Depends(get_async_session)):
+    provider = await session.get(ServiceProvider, provider_id, options=[joinedload(ServiceProvider.user)])
     if not provider:
         raise HTTPException(status_code=404, detail="Provider not found")
     return provider
+
+@router.get("/{provider_id}/availability", response_model=List[AvailabilitySlot], dependencies=[Depends(query_budget(2))])
+async def get_provider_availability(
+    provider_id: int,
+    start_date: date,
+    end_date: Optional[date] = None,
+    duration_minutes: int = Query(60, ge=MIN_BOOKING_MINUTES, le=MAX_BOOKING_MINUTES),
+    step_minutes: int = Query(30, ge=5, le=240),
+    session: AsyncSession = Depends(get_async_session)
+):
+    # Dates are local calendar days in SERVICE_TIMEZONE
+    end_date = end_date or start_date
+    if end_date < start_date or (end_date - start_date).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must be 1 to {MAX_AVAILABILITY_DAYS} days")
+
+    provider = await session.get(ServiceProvider, provider_id)
+    if not provider:
+        raise HTTPException(status_code=404, detail="Provider not found")
+
+    range_start = datetime.combine(start_date, datetime.min.time(), tzinfo=SERVICE_TIMEZONE).astimezone(timezone.utc)
+    range_end = datetime.combine(end_date + timedelta(days=1), datetime.min.time(), tzinfo=SERVICE_TIMEZONE).astimezone(timezone.utc)
+    busy = await session.run_sync(busy_intervals, provider_id, range_start, range_end)
+
+    slots = free_slots(
+        provider, busy, start_date, end_date,
+        timedelta(minutes=duration_minutes), timedelta(minutes=step_minutes),
+        not_before=datetime.now(timezone.utc),
+    )
+    return [{"start": s.astimezone(SERVICE_TIMEZONE), "end": e.astimezone(SERVICE_TIMEZONE)} for s, e in slots]
@@ -1,20 +1,24 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models import User, Booking, Review, BookingStatus, ServiceProvider
 from app.schemas import ReviewCreate, ReviewRead
 from app.auth import get_current_user
+from app.jobs import enqueue
+from app.querybudget import query_budget
+from app.responsecache import response_cache, reviews_tag
 
 router = APIRouter()
 
 @router.post("/", response_model=ReviewRead)
-def post_review(
+async def post_review(
     review_data: ReviewCreate,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    booking = session.get(Booking, review_data.booking_id)
+    booking = await session.get(Booking, review_data.booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
@@ -25,7 +29,7 @@ def post_review(
         raise HTTPException(status_code=400, detail="Reviews can only be left for completed bookings")
 
     # Check if already reviewed
-    existing = session.exec(select(Review).where(Review.booking_id == booking.id)).first()
+    existing = (await session.exec(select(Review).where(Review.booking_id == booking.id))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Review already exists for this booking")
 
@@ -36,20 +40,19 @@ def post_review(
     )
     session.add(new_review)
 
-    # Update provider's average rating
-    provider = session.get(ServiceProvider, booking.provider_id)
-    all_reviews = session.exec(select(Review).join(Booking).where(Booking.provider_id == provider.id)).all()
+    # The rating aggregate and search document are updated after commit by the
+    # job worker, which also invalidates the cached provider responses
+    enqueue(session, "provider_rating", {"provider_id": booking.provider_id, "rating": review_data.rating})
+    if review_data.comment:
+        enqueue(session, "search_document", {"provider_id": booking.provider_id, "comment": review_data.comment})
 
-    total_rating = sum([r.rating for r in all_reviews]) + review_data.rating
-    provider.rating_avg = total_rating / (len(all_reviews) + 1)
-    session.add(provider)
-
-    session.commit()
-    session.refresh(new_review)
+    await session.commit()
+    response_cache.invalidate(reviews_tag(booking.provider_id))
+    await session.refresh(new_review)
     return new_review
 
-@router.get("/provider/{provider_id}", response_model=List[ReviewRead])
-def get_provider_reviews(provider_id: int, session: Session = Depends(get_session)):
+@router.get("/provider/{provider_id}", response_model=List[ReviewRead], dependencies=[Depends(query_budget(1))])
+async def get_provider_reviews(provider_id: int, session: AsyncSession = Depends(get_async_session)):
     statement = select(Review).join(Booking).where(Booking.provider_id == provider_id)
-    results = session.exec(statement).all()
+    results = (await session.exec(statement)).all()
     return results
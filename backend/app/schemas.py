@@ -1,6 +1,6 @@
-from typing import Optional, List
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from typing import Dict, Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from datetime import datetime, time
 from app.models import UserRole, BookingStatus
 
 class UserCreate(BaseModel):
@@ -30,6 +30,9 @@ class ProviderCreate(BaseModel):
     contact_info: str
     location_pincode: str
     profile_picture: Optional[str] = None
+    work_start: time = time(9, 0)
+    work_end: time = time(18, 0)
+    working_days: str = Field("0,1,2,3,4,5", pattern=r"^[0-6](,[0-6])*$")  # Monday = 0
 
 class ProviderRead(BaseModel):
     id: int
@@ -40,14 +43,43 @@ class ProviderRead(BaseModel):
     contact_info: str
     location_pincode: str
     rating_avg: float
+    score: float = 0.0
+    work_start: time
+    work_end: time
+    working_days: str
     user: UserRead
+    distance_km: Optional[float] = None  # Set by radius searches
 
     class Config:
         from_attributes = True
 
+class ProviderPage(BaseModel):
+    items: List[ProviderRead]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+# Upper bound on providers changed by one bulk verification request
+MAX_BULK_VERIFY = 5000
+
+class BulkVerifyRequest(BaseModel):
+    approve: bool
+    # Either explicit ids, or a filter over unverified providers
+    provider_ids: Optional[List[int]] = Field(None, min_length=1, max_length=MAX_BULK_VERIFY)
+    pincode: Optional[str] = None
+    category: Optional[str] = None
+
+class BulkVerifyResult(BaseModel):
+    provider_id: int
+    outcome: str  # approved, rejected, already_verified, not_found
+
+class BulkVerifyResponse(BaseModel):
+    results: List[BulkVerifyResult]
+    has_more: bool = False  # Filter mode: more matching providers remain
+
 class BookingCreate(BaseModel):
     provider_id: int
-    date_time: datetime
+    date_time: datetime  # Naive values are taken as SERVICE_TIMEZONE local time
+    duration_minutes: int = Field(60, ge=15, le=480)
 
 class BookingRead(BaseModel):
     id: int
@@ -55,6 +87,8 @@ class BookingRead(BaseModel):
     provider_id: int
     status: BookingStatus
     date_time: datetime
+    duration_minutes: int
+    end_time: datetime
     created_at: datetime
     provider: Optional[ProviderRead] = None
     customer: Optional[UserRead] = None
@@ -62,6 +96,20 @@ class BookingRead(BaseModel):
     class Config:
         from_attributes = True
 
+class BookingPage(BaseModel):
+    items: List[BookingRead]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+class BookingSummary(BaseModel):
+    # Booking counts per status, every status present
+    counts: Dict[BookingStatus, int]
+    total: int
+
+class AvailabilitySlot(BaseModel):
+    start: datetime
+    end: datetime
+
 class ReviewCreate(BaseModel):
     booking_id: int
     rating: int
@@ -0,0 +1,98 @@
+import re
+from typing import List
+from sqlalchemy import Float, Integer, text
+from sqlalchemy.engine import Connection
+from sqlmodel import Session
+
+# Full-text index over provider name, services and review comments, one
+# document per provider. SQLite uses an FTS5 table keyed by rowid and ranks
+# with bm25(); Postgres uses a weighted tsvector with a GIN index and ts_rank_cd.
+SEARCH_TABLE = "provider_search"
+
+# Relative weight of matches in name, services and review text
+SQLITE_BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+def _is_sqlite(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+def _key(bind) -> str:
+    return "rowid" if _is_sqlite(bind) else "provider_id"
+
+def create_search_index(conn: Connection):
+    if _is_sqlite(conn):
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            "USING fts5(name, services, reviews, tokenize='porter unicode61')"
+        ))
+        return
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+            provider_id INTEGER PRIMARY KEY REFERENCES serviceprovider(id) ON DELETE CASCADE,
+            name TEXT NOT NULL DEFAULT '',
+            services TEXT NOT NULL DEFAULT '',
+            reviews TEXT NOT NULL DEFAULT '',
+            document tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', name), 'A') ||
+                setweight(to_tsvector('english', services), 'B') ||
+                setweight(to_tsvector('english', reviews), 'D')
+            ) STORED
+        )
+    """))
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"))
+
+def _documents_select(bind, where: str = "") -> str:
+    # (id, name, services, reviews) rows built from the source tables
+    concat = "group_concat(r.comment, ' ')" if _is_sqlite(bind) else "string_agg(r.comment, ' ')"
+    return f"""
+        SELECT sp.id, u.name, sp.services, coalesce((
+            SELECT {concat} FROM review r JOIN booking b ON b.id = r.booking_id
+            WHERE b.provider_id = sp.id AND r.comment IS NOT NULL
+        ), '')
+        FROM serviceprovider sp JOIN "user" u ON u.id = sp.user_id {where}
+    """
+
+def index_provider(session: Session, provider_id: int):
+    # (Re)writes one provider's document; caller commits
+    bind = session.get_bind()
+    key = _key(bind)
+    session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} = :id"), {"id": provider_id})
+    session.execute(
+        text(f"INSERT INTO {SEARCH_TABLE} ({key}, name, services, reviews) " + _documents_select(bind, "WHERE sp.id = :id")),
+        {"id": provider_id},
+    )
+
+def add_review_text(session: Session, provider_id: int, comments: str):
+    # Appends new review comments instead of rebuilding the whole document; caller commits
+    result = session.execute(
+        text(f"UPDATE {SEARCH_TABLE} SET reviews = reviews || ' ' || :comments WHERE {_key(session.get_bind())} = :id"),
+        {"id": provider_id, "comments": comments},
+    )
+    if result.rowcount == 0:
+        # No document yet; build it, review included
+        index_provider(session, provider_id)
+
+def rebuild_search_index(session: Session):
+    bind = session.get_bind()
+    session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    session.execute(text(f"INSERT INTO {SEARCH_TABLE} ({_key(bind)}, name, services, reviews) " + _documents_select(bind)))
+    session.commit()
+
+def search_terms(q: str) -> List[str]:
+    # Free text to plain word tokens, so user input never reaches the query syntax
+    return re.findall(r"\w+", q.lower())[:16]
+
+def search_matches(bind, terms: List[str]):
+    """Subquery of (provider_id, rank) for providers matching any term, where a
+    lower rank is a better match. Served from the full-text index."""
+    if _is_sqlite(bind):
+        weights = ", ".join(str(w) for w in SQLITE_BM25_WEIGHTS)
+        statement = text(
+            f"SELECT rowid AS provider_id, bm25({SEARCH_TABLE}, {weights}) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query"
+        ).bindparams(query=" OR ".join(f'"{term}"' for term in terms))
+    else:
+        statement = text(
+            f"SELECT provider_id, -ts_rank_cd(document, to_tsquery('english', :query)) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('english', :query)"
+        ).bindparams(query=" | ".join(terms))
+    return statement.columns(provider_id=Integer, rank=Float).subquery("search")
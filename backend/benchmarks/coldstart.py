@@ -0,0 +1,139 @@
+"""Cold-start profile of the API entry point.
+
+Each run starts a fresh interpreter with an empty database directory, the way
+a new serverless instance starts with an empty /tmp, and times importing
+app.main, running the lifespan startup and serving the first request. One
+extra run under -X importtime (which slows imports down, so it is not timed)
+lists the slowest imports. Reports when the median time to first response is over
+budget, and with --strict also exits non-zero. Run from the backend directory:
+
+    python -m benchmarks.coldstart
+    python -m benchmarks.coldstart --image data/schema.db --budget-ms 1500 --strict
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import time
+started = time.perf_counter()
+import asyncio, json, sys
+from app.main import app
+imported = time.perf_counter()
+
+async def first_response(path):
+    messages = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        messages.append(message)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        await app(scope, receive, send)
+    return ready, messages[0]["status"]
+
+ready, status = asyncio.run(first_response(sys.argv[1]))
+done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_request_ms": (done - ready) * 1000,
+    "total_ms": (done - started) * 1000,
+    "status": status,
+}))
+"""
+
+def parse_importtime(stderr: str):
+    # "import time: self [us] | cumulative | imported package"
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return modules
+
+def probe(path: str, image, importtime: bool = False):
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ)
+        env.pop("VERCEL", None)  # Keep the database in our scratch directory
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'cold.db')}"
+        env["SQLITE_IMAGE"] = os.path.abspath(image) if image else ""
+        proc = subprocess.run(
+            [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", PROBE, path],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+        )
+    if proc.returncode != 0:
+        sys.exit(f"Cold-start probe failed:\n{proc.stderr[-4000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1]), parse_importtime(proc.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API cold starts in fresh interpreters.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/providers/", help="first request to serve")
+    parser.add_argument("--image", help="prebuilt database copied in on startup (see seed.py --schema-only --image)")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="allowed median time to first response")
+    parser.add_argument("--strict", action="store_true", help="exit non-zero when over budget")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--output", default="coldstart_report.json")
+    args = parser.parse_args()
+
+    timings = [probe(args.path, args.image)[0] for _ in range(args.runs)]
+    _, modules = probe(args.path, args.image, importtime=True)
+
+    median = {
+        key: round(statistics.median(t[key] for t in timings), 1)
+        for key in ("import_ms", "startup_ms", "first_request_ms", "total_ms")
+    }
+    by_self = sorted(modules, key=lambda m: m[1], reverse=True)
+    app_modules = [m for m in by_self if m[0] == "app" or m[0].startswith("app.")]
+    report = {
+        "runs": args.runs,
+        "path": args.path,
+        "image": args.image,
+        "statuses": sorted({t["status"] for t in timings}),
+        "median": median,
+        "budget_ms": args.budget_ms,
+        "slowest_imports": [
+            {"module": n, "self_ms": round(s, 1), "cumulative_ms": round(c, 1)} for n, s, c in by_self[:args.top]
+        ],
+        "app_modules": [
+            {"module": n, "self_ms": round(s, 1), "cumulative_ms": round(c, 1)}
+            for n, s, c in sorted(app_modules, key=lambda m: m[2], reverse=True)
+        ],
+    }
+
+    print(f"Cold start over {args.runs} runs (median), first request GET {args.path} -> {report['statuses']}")
+    for key, value in median.items():
+        print(f"  {key:<18} {value:>8.1f}")
+    print("\nSlowest imports by self time (ms, under -X importtime):")
+    for entry in report["slowest_imports"]:
+        print(f"  {entry['self_ms']:>7.1f} {entry['cumulative_ms']:>8.1f}  {entry['module']}")
+    print("\nApplication modules by cumulative time (ms):")
+    for entry in report["app_modules"]:
+        print(f"  {entry['self_ms']:>7.1f} {entry['cumulative_ms']:>8.1f}  {entry['module']}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if median["total_ms"] > args.budget_ms:
+        print(f"\nOver budget: {median['total_ms']:.1f} ms > {args.budget_ms:.1f} ms")
+        if args.strict:
+            sys.exit(1)
+        return
+    print(f"\nWithin budget: {median['total_ms']:.1f} ms <= {args.budget_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""In-process endpoint benchmarks.
+
+Drives the ASGI app through httpx.AsyncClient against a freshly generated
+SQLite database, then reports throughput and latency percentiles per
+scenario. Run from the backend directory:
+
+    python -m benchmarks.run --providers 2000 --bookings 50000
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+async def run_scenario(name, client, make_request, requests, concurrency):
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            response = await make_request(client, i)
+            # Errors and shed requests return early; timing them would flatter the endpoint
+            if response.is_success:
+                latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "requests": requests,
+        "errors": requests - len(latencies),
+        "concurrency": concurrency,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+    }
+    print(f"{name:<16} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+          f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  {result['status_codes']}")
+    return result
+
+def compare(results, baseline, threshold):
+    # A scenario regresses when any request fails, or when p95 latency grows or
+    # throughput (of successful requests) falls by more than `threshold`
+    failures = []
+    for name, current in results["scenarios"].items():
+        if current.get("errors"):
+            failures.append(f"{name}: {current['errors']} non-2xx responses {current['status_codes']}")
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            failures.append(f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+            failures.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return failures
+
+async def benchmark(args):
+    import httpx
+    from sqlmodel import Session, select
+    import seed as seeding
+    from app.main import app
+    from app.database import engine, async_engine, create_db_and_tables
+    from app.geo import load_pincode_index, pincode_index
+    from app.auth import create_access_token
+    from app.models import User, UserRole, ServiceProvider, Booking, BookingStatus, Review, ServiceCategory
+
+    # Per-request access logs would dominate the output
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app.pooling").setLevel(logging.WARNING)
+
+    seeding.seed()
+    seeding.generate(args.customers, args.providers, args.bookings, 0.5, args.seed, 10000, 180)
+    # What the lifespan hook does; ASGITransport does not run it
+    create_db_and_tables()
+    load_pincode_index()
+
+    rng = random.Random(args.seed)
+    with Session(engine) as session:
+        customers = session.exec(
+            select(User.email).where(User.role == UserRole.CUSTOMER).order_by(User.id).limit(2000)
+        ).all()
+        provider_ids = session.exec(
+            select(ServiceProvider.id).where(ServiceProvider.verified == True).order_by(ServiceProvider.id)
+        ).all()
+        categories = session.exec(select(ServiceCategory.name)).all()
+        # Completed, unreviewed bookings, each reviewable once by its customer
+        reviewable = session.exec(
+            select(Booking.id, User.email)
+            .join(User, User.id == Booking.user_id)
+            .outerjoin(Review, Review.booking_id == Booking.id)
+            .where(Booking.status == BookingStatus.COMPLETED, Review.id == None)
+            .limit(args.requests)
+        ).all()
+    pincodes = sorted(pincode_index.centroids) or seeding.FALLBACK_PINCODES
+    # Tokens minted directly so setup does not pay for bcrypt
+    token = lambda email: {"Authorization": "Bearer " + create_access_token({"sub": email})}
+    customer_headers = [token(email) for email in customers]
+    admin_headers = token("admin@example.com")
+    # Far enough ahead to miss generated bookings; Sundays are outside default working days
+    booking_days = [day for day in (datetime.now(timezone.utc).date() + timedelta(days=d) for d in range(60, 400))
+                    if day.weekday() != 6]
+
+    async def search(client, i):
+        params = {"pincode": rng.choice(pincodes), "sort_by": rng.choice(["rating", "experience"])}
+        if rng.random() < 0.7:
+            params["category"] = rng.choice(categories)
+        if rng.random() < 0.3:
+            params["radius_km"] = 5
+        return await client.get("/providers/", params=params)
+
+    async def login(client, i):
+        return await client.post("/auth/login", data={"username": rng.choice(customers), "password": "password123"})
+
+    async def book(client, i):
+        day = rng.choice(booking_days)
+        hour = rng.randrange(9, 17)
+        return await client.post("/bookings/", headers=rng.choice(customer_headers), json={
+            "provider_id": rng.choice(provider_ids),
+            "date_time": f"{day.isoformat()}T{hour:02d}:00:00",
+        })
+
+    async def review(client, i):
+        booking_id, email = reviewable[i % len(reviewable)]
+        return await client.post("/reviews/", headers=token(email), json={
+            "booking_id": booking_id, "rating": rng.randint(1, 5), "comment": "Benchmark review",
+        })
+
+    async def analytics(client, i):
+        return await client.get("/admin/analytics", headers=admin_headers,
+                                params={"granularity": rng.choice(["day", "week", "month"])})
+
+    scenarios = {
+        "provider_search": (search, args.requests),
+        "login": (login, max(args.requests // 10, 1)),
+        "booking_create": (book, args.requests),
+        "review_post": (review, min(args.requests, len(reviewable))),
+        "admin_analytics": (analytics, args.requests),
+    }
+    selected = args.scenarios or list(scenarios)
+
+    results = {
+        "dataset": {"customers": args.customers, "providers": args.providers, "bookings": args.bookings},
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in selected:
+            make_request, requests = scenarios[name]
+            if requests:
+                results["scenarios"][name] = await run_scenario(name, client, make_request, requests, args.concurrency)
+    await async_engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints in-process.")
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--providers", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", nargs="*", help="subset of scenarios to run")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="fail if results regress against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--save-baseline", help="also write results to this path as the new baseline")
+    parser.add_argument("--database", help="SQLite file to use (default: a fresh temporary file)")
+    args = parser.parse_args()
+
+    # Must be set before the app (and its engines) are imported
+    path = args.database or os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    # Every simulated user shares one address, and the harness picks its own
+    # concurrency; measure the endpoints, not the rate limits or load shedding
+    os.environ.update({
+        "RATE_LIMIT_AUTH_IP": "0",
+        "RATE_LIMIT_LOGIN_ACCOUNT": "0",
+        "RATE_LIMIT_SEARCH_IP": "0",
+        "ROUTE_MAX_CONCURRENCY": "0",
+        "ROUTE_CONCURRENCY_LIMITS": "",
+    })
+
+    results = asyncio.run(benchmark(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.threshold)
+        if failures:
+            print("Performance regressions:\n  " + "\n  ".join(failures))
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,38 @@
-from sqlmodel import Session, create_engine, select
-from app.models import User, ServiceProvider, UserRole, Booking, BookingStatus
-from app.auth import get_password_hash
-from app.database import create_db_and_tables
-from datetime import datetime, timedelta
+import argparse
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from sqlmodel import Session, select, func
+from app.models import User, ServiceProvider, UserRole, Booking, BookingStatus, Review, ProviderCategoryLink
+from app.auth import get_password_hash
+from app.database import engine, create_db_and_tables
+from app.categories import sync_provider_categories, get_or_create_categories
+from app.geo import pincode_index, load_pincode_index
+from app.ratings import recompute_ratings, recompute_scores
+from app.rollups import rebuild_rollups
+from app.search import rebuild_search_index
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./local_service_finder.db")
-engine = create_engine(DATABASE_URL)
+# Relative popularity of each category among providers
+CATEGORY_WEIGHTS = {
+    "Plumber": 18, "Electrician": 17, "Cleaner": 15, "Painter": 10, "Carpenter": 9,
+    "AC Repair": 8, "Pest Control": 6, "Appliance Repair": 6, "Gardener": 4,
+    "Beautician": 4, "Tutor": 2, "Mover": 1,
+}
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ananya", "Diya", "Isha", "Kabir", "Meera", "Neha", "Priya",
+               "Rahul", "Riya", "Rohan", "Sanjay", "Sneha", "Tara", "Varun", "Vikram", "Yash", "Zoya"]
+LAST_NAMES = ["Sharma", "Verma", "Gupta", "Singh", "Kumar", "Patel", "Reddy", "Iyer", "Nair", "Das"]
+# Generated history ends here unless --now says otherwise, so runs are reproducible
+GENERATE_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+FALLBACK_PINCODES = [f"1100{n:02d}" for n in range(1, 100)]
+REVIEW_COMMENTS = {
+    1: ["Did not show up on time.", "Poor work, had to call someone else."],
+    2: ["Job done but left a mess.", "Overpriced for the work."],
+    3: ["Okay service.", "Average, got the job done."],
+    4: ["Good work, would book again.", "Quick and polite."],
+    5: ["Excellent! Fixed the leaking kitchen tap in minutes.", "Very professional and tidy."],
+}
 
 def seed():
     # Ensure tables are created before seeding
@@ -31,6 +54,9 @@ def seed():
         )
         session.add(admin)
 
+        # All demo providers and the customer share one password, so hash it once
+        demo_hash = get_password_hash("password123")
+
         # Create Providers
         providers_data = [
             ("John Plumber", "john@plumber.com", "Plumber", 5, "1234567890", "110001"),
@@ -39,15 +65,9 @@ def seed():
         ]
 
         for name, email, svc, exp, contact, pin in providers_data:
-            user = User(
-                name=name,
-                email=email,
-                password_hash=get_password_hash("password123"),
-                role=UserRole.PROVIDER
-            )
+            user = User(name=name, email=email, password_hash=demo_hash, role=UserRole.PROVIDER)
             session.add(user)
-            session.commit()
-            session.refresh(user)
+            session.flush()
 
             provider = ServiceProvider(
                 user_id=user.id,
@@ -55,22 +75,216 @@ def seed():
                 experience=exp,
                 contact_info=contact,
                 location_pincode=pin,
-                verified=True,
-                rating_avg=4.5
+                verified=True
             )
             session.add(provider)
+            sync_provider_categories(session, provider)
 
         # Create Customer
         customer = User(
             name="Jane Doe",
             email="jane@example.com",
-            password_hash=get_password_hash("password123"),
+            password_hash=demo_hash,
             role=UserRole.CUSTOMER
         )
         session.add(customer)
         session.commit()
+        recompute_scores(session)
+        rebuild_search_index(session)
 
         print("Seeding complete!")
 
+def _next_id(session: Session, model) -> int:
+    return (session.exec(select(func.max(model.id))).one() or 0) + 1
+
+def _insert(session: Session, model, rows: list):
+    if rows:
+        session.execute(model.__table__.insert(), rows)
+        rows.clear()
+
+def generate(customers: int, providers: int, bookings: int, review_rate: float,
+             rng_seed: int, batch_size: int, days: int, now: datetime = GENERATE_EPOCH):
+    """Bulk-generates a realistic dataset for load testing, with `days` of history
+    up to `now`. Same arguments and seed, same data. Every generated account's
+    password is `password123`."""
+    rng = random.Random(rng_seed)
+    started = time.perf_counter()
+    now = (now if now.tzinfo else now.replace(tzinfo=timezone.utc)).astimezone(timezone.utc)
+    now = now.replace(minute=0, second=0, microsecond=0)
+    created_at = now - timedelta(days=days)
+    create_db_and_tables()
+    load_pincode_index()
+    pincodes = sorted(pincode_index.centroids) or FALLBACK_PINCODES
+    # Zipf-like popularity: a few dense neighbourhoods, a long tail of quiet ones
+    pincode_weights = [1 / (rank + 1) for rank in range(len(pincodes))]
+    rng.shuffle(pincodes)
+    password_hash = get_password_hash("password123")
+
+    with Session(engine) as session:
+        categories = get_or_create_categories(session, list(CATEGORY_WEIGHTS))
+        session.commit()
+        category_ids = {c.name: c.id for c in categories}
+        category_names = list(CATEGORY_WEIGHTS)
+        category_weights = list(CATEGORY_WEIGHTS.values())
+
+        user_id = _next_id(session, User)
+        provider_id = _next_id(session, ServiceProvider)
+        booking_id = _next_id(session, Booking)
+        review_id = _next_id(session, Review)
+
+        def person():
+            return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+        # Customers
+        rows = []
+        first_customer = user_id
+        for _ in range(customers):
+            rows.append({
+                "id": user_id, "name": person(), "email": f"customer{user_id}@example.com",
+                "password_hash": password_hash, "role": UserRole.CUSTOMER,
+                "created_at": created_at + timedelta(seconds=rng.randrange(days * 86400)),
+            })
+            user_id += 1
+            if len(rows) >= batch_size:
+                _insert(session, User, rows)
+        _insert(session, User, rows)
+        print(f"{customers} customers ({time.perf_counter() - started:.1f}s)")
+
+        # Providers with their user accounts and category links
+        users, provider_rows, links = [], [], []
+        quality = {}
+        first_provider = provider_id
+        for _ in range(providers):
+            names = set(rng.choices(category_names, category_weights, k=rng.choice((1, 1, 1, 2, 2, 3))))
+            users.append({
+                "id": user_id, "name": person(), "email": f"provider{user_id}@example.com",
+                "password_hash": password_hash, "role": UserRole.PROVIDER,
+                "created_at": created_at + timedelta(seconds=rng.randrange(days * 86400)),
+            })
+            provider_rows.append({
+                "id": provider_id, "user_id": user_id, "services": ", ".join(sorted(names)),
+                "experience": min(int(rng.expovariate(1 / 6)), 40), "verified": rng.random() < 0.85,
+                "contact_info": f"9{rng.randrange(10 ** 9):09d}",
+                "location_pincode": rng.choices(pincodes, pincode_weights)[0],
+            })
+            links.extend({"provider_id": provider_id, "category_id": category_ids[n]} for n in names)
+            # Hidden service quality that drives this provider's review ratings
+            quality[provider_id] = min(max(rng.gauss(4.0, 0.6), 1.0), 5.0)
+            user_id += 1
+            provider_id += 1
+            if len(provider_rows) >= batch_size:
+                _insert(session, User, users)
+                _insert(session, ServiceProvider, provider_rows)
+                _insert(session, ProviderCategoryLink, links)
+        _insert(session, User, users)
+        _insert(session, ServiceProvider, provider_rows)
+        _insert(session, ProviderCategoryLink, links)
+        session.commit()
+        print(f"{providers} providers ({time.perf_counter() - started:.1f}s)")
+
+        # Bookings follow a heavy-tailed popularity per provider. Each provider's
+        # bookings take distinct hourly slots between 09:00 and 18:00 IST, so active
+        # bookings never overlap.
+        provider_ids = range(first_provider, provider_id)
+        popularity = [rng.paretovariate(1.5) for _ in provider_ids]
+        per_provider = Counter(rng.choices(provider_ids, popularity, k=bookings)) if providers else Counter()
+        future_days = 30
+        first_slot = (now - timedelta(days=days)).replace(hour=3, minute=30)  # 09:00 IST
+        total_slots = (days + future_days) * 9
+        # Bookings past a provider's free slots go to other providers, by popularity
+        overflow = sum(max(count - total_slots, 0) for count in per_provider.values())
+        for pid in per_provider:
+            per_provider[pid] = min(per_provider[pid], total_slots)
+        while overflow:
+            room = [pid for pid in provider_ids if per_provider[pid] < total_slots]
+            if not room:
+                break
+            weights = [popularity[pid - first_provider] for pid in room]
+            for pid in rng.choices(room, weights, k=overflow):
+                if per_provider[pid] < total_slots:
+                    per_provider[pid] += 1
+                    overflow -= 1
+        if overflow:
+            print(f"Warning: only {bookings - overflow} of {bookings} bookings fit "
+                  f"({providers} providers x {total_slots} slots); raise --providers or --days")
+        booking_rows, review_rows = [], []
+        made = reviews = 0
+        for pid, count in per_provider.items():
+            for slot in rng.sample(range(total_slots), count):
+                start = first_slot + timedelta(days=slot // 9, hours=slot % 9)
+                if start > now:
+                    status = BookingStatus.PENDING
+                else:
+                    status = rng.choices(
+                        (BookingStatus.COMPLETED, BookingStatus.CANCELLED, BookingStatus.PENDING), (80, 15, 5)
+                    )[0]
+                booked_at = min(start - timedelta(hours=rng.randrange(1, 14 * 24)), now)
+                booking_rows.append({
+                    "id": booking_id, "user_id": first_customer + rng.randrange(customers),
+                    "provider_id": pid, "status": status, "date_time": start,
+                    "duration_minutes": 60, "end_time": start + timedelta(minutes=60), "created_at": booked_at,
+                })
+                if status == BookingStatus.COMPLETED and rng.random() < review_rate:
+                    rating = min(max(round(rng.gauss(quality[pid], 0.8)), 1), 5)
+                    review_rows.append({
+                        "id": review_id, "booking_id": booking_id, "rating": rating,
+                        "comment": rng.choice(REVIEW_COMMENTS[rating]) if rng.random() < 0.7 else None,
+                        "created_at": min(start + timedelta(hours=rng.randrange(1, 72)), now),
+                    })
+                    review_id += 1
+                    reviews += 1
+                booking_id += 1
+                made += 1
+                if len(booking_rows) >= batch_size:
+                    _insert(session, Booking, booking_rows)
+                    _insert(session, Review, review_rows)
+        _insert(session, Booking, booking_rows)
+        _insert(session, Review, review_rows)
+        session.commit()
+        print(f"{made} bookings, {reviews} reviews ({time.perf_counter() - started:.1f}s)")
+
+        # Derived data, rebuilt set-based from what was just inserted
+        recompute_ratings(session)
+        recompute_scores(session)
+        rebuild_rollups(session)
+        rebuild_search_index(session)
+        print(f"Generation complete in {time.perf_counter() - started:.1f}s")
+
+def write_image(path: str):
+    # Compacted, self-contained copy of the seeded database, for SQLITE_IMAGE
+    if engine.dialect.name != "sqlite":
+        raise SystemExit("--image needs a SQLite DATABASE_URL")
+    if os.path.exists(path):
+        os.remove(path)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM INTO ?", (path,))
+    print(f"Wrote database image to {path} ({os.path.getsize(path) // 1024} KiB)")
+
 if __name__ == "__main__":
-    seed()
+    parser = argparse.ArgumentParser(description="Seed demo accounts, or generate a load-testing dataset.")
+    parser.add_argument("--customers", type=int, default=0, help="customers to generate")
+    parser.add_argument("--providers", type=int, default=0, help="providers to generate")
+    parser.add_argument("--bookings", type=int, default=0, help="bookings to generate")
+    parser.add_argument("--review-rate", type=float, default=0.6, help="share of completed bookings with a review")
+    parser.add_argument("--days", type=int, default=365, help="days of booking history")
+    parser.add_argument("--now", type=datetime.fromisoformat, default=GENERATE_EPOCH,
+                        help=f"end of the generated history, ISO format (default {GENERATE_EPOCH.date()})")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per bulk insert")
+    parser.add_argument("--image", help="also write a prebuilt copy of the database to this path (see SQLITE_IMAGE)")
+    parser.add_argument("--schema-only", action="store_true", help="create the schema without demo accounts (for --image)")
+    args = parser.parse_args()
+    if args.bookings and not (args.customers and args.providers):
+        parser.error("--bookings needs --customers and --providers")
+    if args.schema_only and (args.customers or args.providers or args.bookings):
+        parser.error("--schema-only cannot be combined with generated data")
+
+    if args.schema_only:
+        create_db_and_tables()
+    else:
+        seed()
+    if args.customers or args.providers or args.bookings:
+        generate(args.customers, args.providers, args.bookings, args.review_rate,
+                 args.seed, args.batch_size, args.days, args.now)
+    if args.image:
+        write_image(args.image)
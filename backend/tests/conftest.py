@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+# Must be set before the app (and its engines) are imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='tests-'), 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ["QUERY_BUDGET_ENFORCE"] = "1"
+os.environ["JOB_WORKER"] = "0"
+os.environ["RESPONSE_CACHE_MAX_BYTES"] = "0"
+for name in ("RATE_LIMIT_AUTH_IP", "RATE_LIMIT_LOGIN_ACCOUNT", "RATE_LIMIT_SEARCH_IP"):
+    os.environ[name] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    import seed as seeding
+    from app.main import app
+    seeding.seed()
+    # Enough rows that every list page holds many items, so a per-row query shows up
+    seeding.generate(300, 40, 3000, 0.6, 7, 1000, 120)
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,45 @@
+"""Rate limits key on an address the client cannot choose."""
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from app import admission
+from app.admission import MemoryBuckets, RateLimiter, Rate, client_ip, limit_by_ip
+
+def request(forwarded_for=None, peer="10.0.0.9") -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (peer, 1234)})
+
+@pytest.mark.parametrize("trusted, hops, forwarded_for, expected", [
+    (False, 1, "1.1.1.1", "10.0.0.9"),
+    (True, 1, None, "10.0.0.9"),
+    (True, 1, "", "10.0.0.9"),
+    (True, 1, "203.0.113.7", "203.0.113.7"),
+    # Entries left of those our proxies appended are whatever the client sent
+    (True, 1, "1.1.1.1, 203.0.113.7", "203.0.113.7"),
+    (True, 2, "1.1.1.1, 203.0.113.7, 10.0.0.2", "203.0.113.7"),
+    (True, 2, " 203.0.113.7 ,10.0.0.2 ", "203.0.113.7"),
+    # Fewer entries than proxies: the leftmost is the best there is
+    (True, 3, "203.0.113.7, 10.0.0.2", "203.0.113.7"),
+])
+def test_client_ip(monkeypatch, trusted, hops, forwarded_for, expected):
+    monkeypatch.setattr(admission, "TRUST_FORWARDED_FOR", trusted)
+    monkeypatch.setattr(admission, "TRUSTED_PROXY_HOPS", hops)
+    assert client_ip(request(forwarded_for)) == expected
+
+def test_spoofed_forwarded_for_shares_the_bucket(monkeypatch):
+    monkeypatch.setattr(admission, "TRUST_FORWARDED_FOR", True)
+    monkeypatch.setattr(admission, "TRUSTED_PROXY_HOPS", 1)
+    monkeypatch.setattr(admission, "limiter", RateLimiter(MemoryBuckets(100)))
+    app = FastAPI()
+
+    @app.get("/", dependencies=[Depends(limit_by_ip("test", Rate(2, 3600)))])
+    def limited():
+        return {}
+
+    client = TestClient(app)
+    statuses = [
+        client.get("/", headers={"X-Forwarded-For": f"192.0.2.{i}, 203.0.113.7"}).status_code for i in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+    assert client.get("/", headers={"X-Forwarded-For": "203.0.113.8"}).status_code == 200
@@ -0,0 +1,87 @@
+"""Bookings never double-book a provider, even around overlaps left by earlier releases."""
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import Session, select
+from app.auth import create_access_token
+from app.availability import to_utc, find_conflict, overlapping_bookings
+from app.database import engine
+from app.models import User, UserRole, ServiceProvider, Booking, BookingStatus
+
+def auth(email: str) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"sub": email})}
+
+def local(day: str, hour: int, minute: int = 0) -> str:
+    # Naive local time, as clients send it; generated bookings end well before these days
+    return f"{day}T{hour:02d}:{minute:02d}:00"
+
+@pytest.fixture(scope="module")
+def people(client):
+    with Session(engine) as session:
+        provider = session.exec(
+            select(ServiceProvider).where(ServiceProvider.verified == True).order_by(ServiceProvider.id)
+        ).first()
+        customers = session.exec(
+            select(User.email).where(User.role == UserRole.CUSTOMER).order_by(User.id).limit(2)
+        ).all()
+        return {
+            "provider_id": provider.id,
+            "provider": auth(session.get(User, provider.user_id).email),
+            "first": auth(customers[0]),
+            "second": auth(customers[1]),
+        }
+
+def book(client, people, who, date_time, minutes=60):
+    return client.post("/bookings/", headers=people[who], json={
+        "provider_id": people["provider_id"], "date_time": date_time, "duration_minutes": minutes,
+    })
+
+def test_overlapping_booking_is_rejected(client, people):
+    day = "2030-03-05"  # A Tuesday
+    assert book(client, people, "first", local(day, 10)).status_code == 200
+    assert book(client, people, "second", local(day, 10, 30)).status_code == 409
+    assert book(client, people, "second", local(day, 9, 30)).status_code == 409
+    # Back to back is fine
+    assert book(client, people, "second", local(day, 11)).status_code == 200
+    assert book(client, people, "second", local(day, 9)).status_code == 200
+
+def test_outside_working_hours_is_rejected(client, people):
+    assert book(client, people, "first", local("2030-03-06", 17, 30)).status_code == 400
+    assert book(client, people, "first", local("2030-03-10", 10)).status_code == 400  # Sunday
+
+def test_cancelled_slot_is_free_and_cannot_be_reactivated_once_taken(client, people):
+    day = "2030-03-07"
+    first = book(client, people, "first", local(day, 14)).json()
+    response = client.patch(f"/bookings/{first['id']}/status", headers=people["first"], params={"status": "cancelled"})
+    assert response.status_code == 200
+    assert book(client, people, "second", local(day, 14, 30)).status_code == 200
+    response = client.patch(f"/bookings/{first['id']}/status", headers=people["provider"], params={"status": "pending"})
+    assert response.status_code == 409
+    assert client.get("/bookings/my-bookings", headers=people["first"], params={"status": "cancelled"}).status_code == 200
+
+def test_legacy_overlaps_still_block_new_bookings(client, people):
+    # Two active bookings that overlap each other, as older releases could leave
+    day = "2030-03-08"
+    with Session(engine) as session:
+        customer_id = session.exec(select(User.id).where(User.role == UserRole.CUSTOMER)).first()
+        rows = [
+            Booking(user_id=customer_id, provider_id=people["provider_id"], date_time=to_utc(datetime.fromisoformat(start)),
+                    duration_minutes=minutes, end_time=to_utc(datetime.fromisoformat(start)) + timedelta(minutes=minutes))
+            for start, minutes in ((local(day, 10), 180), (local(day, 11), 60))
+        ]
+        session.add_all(rows)
+        session.commit()
+        long_id, short_id = rows[0].id, rows[1].id
+
+        # Only the long booking covers 12:30; the later, shorter one ends at 12:00
+        start = to_utc(datetime.fromisoformat(local(day, 12, 30)))
+        assert find_conflict(session, people["provider_id"], start, start + timedelta(minutes=30)).id == long_id
+        assert (long_id, short_id) in overlapping_bookings(session)
+
+    assert book(client, people, "second", local(day, 12, 30), minutes=30).status_code == 409
+    assert book(client, people, "second", local(day, 13)).status_code == 200
+
+    with Session(engine) as session:
+        for booking in session.exec(select(Booking).where(Booking.id.in_([long_id, short_id]))):
+            booking.status = BookingStatus.CANCELLED
+            session.add(booking)
+        session.commit()
@@ -0,0 +1,116 @@
+"""Queued side effects: review deltas add up to a full recount, and one bad job never sinks its batch."""
+import pytest
+from sqlmodel import Session, select, func, update, delete
+from app.auth import create_access_token
+from app.database import engine
+from app.jobs import HANDLERS, enqueue, worker
+from app.models import User, ServiceProvider, Booking, BookingStatus, Review, Job, JobStatus
+from app.ratings import refresh_ratings
+
+def auth(email: str) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"sub": email})}
+
+def run_jobs():
+    with Session(engine) as session:
+        while worker.run_batch(session):
+            pass
+
+def provider_row(provider_id: int):
+    with Session(engine) as session:
+        provider = session.get(ServiceProvider, provider_id)
+        return provider.rating_sum, provider.rating_count, provider.rating_avg, provider.score
+
+@pytest.fixture
+def flaky(monkeypatch):
+    # A job kind failing for any batch that holds a payload marked "fail"
+    ran = []
+
+    def handler(session, payloads):
+        if any(payload.get("fail") for payload in payloads):
+            raise ValueError("bad payload")
+        ran.extend(payload["n"] for payload in payloads)
+        return []
+
+    monkeypatch.setitem(HANDLERS, "test_flaky", handler)
+    yield ran
+    with Session(engine) as session:
+        session.exec(delete(Job).where(Job.kind == "test_flaky"))
+        session.commit()
+
+def test_review_deltas_match_a_recount(client):
+    run_jobs()
+    with Session(engine) as session:
+        # The verified provider with the most completed, unreviewed bookings
+        provider_id = session.exec(
+            select(Booking.provider_id)
+            .join(ServiceProvider, ServiceProvider.id == Booking.provider_id)
+            .outerjoin(Review, Review.booking_id == Booking.id)
+            .where(Booking.status == BookingStatus.COMPLETED, Review.id == None, ServiceProvider.verified == True)
+            .group_by(Booking.provider_id)
+            .order_by(func.count().desc())
+        ).first()
+        reviewable = session.exec(
+            select(Booking.id, User.email)
+            .join(User, User.id == Booking.user_id)
+            .outerjoin(Review, Review.booking_id == Booking.id)
+            .where(Booking.provider_id == provider_id, Booking.status == BookingStatus.COMPLETED, Review.id == None)
+            .limit(4)
+        ).all()
+    assert len(reviewable) >= 2
+
+    for i, (booking_id, email) in enumerate(reviewable):
+        response = client.post("/reviews/", headers=auth(email), json={
+            "booking_id": booking_id, "rating": 1 + i % 5, "comment": f"Quibbleworthy visit {i}" if i % 2 else None,
+        })
+        assert response.status_code == 200, response.text
+    with Session(engine) as session:
+        queued = session.exec(select(func.count()).where(Job.kind == "provider_rating")).one()
+    assert queued == len(reviewable)
+
+    before = provider_row(provider_id)
+    run_jobs()
+    applied = provider_row(provider_id)
+    assert applied[1] == before[1] + len(reviewable)
+    with Session(engine) as session:
+        refresh_ratings(session, [provider_id])
+        session.commit()
+    assert provider_row(provider_id) == pytest.approx(applied)
+
+    # The comments were appended to the provider's search document
+    results = client.get("/providers/", params={"q": "quibbleworthy"}).json()["items"]
+    assert provider_id in [provider["id"] for provider in results]
+
+def test_failing_job_is_isolated(flaky):
+    with Session(engine) as session:
+        for n in range(8):
+            enqueue(session, "test_flaky", {"n": n, "fail": n == 5})
+        session.commit()
+    run_jobs()
+    assert sorted(flaky) == [0, 1, 2, 3, 4, 6, 7]
+    with Session(engine) as session:
+        left = session.exec(select(Job).where(Job.kind == "test_flaky")).all()
+    assert len(left) == 1
+    assert left[0].status == JobStatus.PENDING
+    assert left[0].attempts == 1
+    assert "bad payload" in left[0].last_error
+
+def test_expired_lease_leaves_jobs_to_their_new_claimant(monkeypatch, flaky):
+    def reclaimed(session, payloads):
+        # Another worker claims the jobs while this one is still running them
+        session.exec(update(Job).where(Job.kind == "test_flaky").values(run_after=func.datetime("now", "+1 hour")))
+        flaky.extend(payload["n"] for payload in payloads)
+        return []
+
+    monkeypatch.setitem(HANDLERS, "test_flaky", reclaimed)
+    with Session(engine) as session:
+        for n in range(3):
+            enqueue(session, "test_flaky", {"n": n})
+        session.commit()
+    processed = worker.processed[("test_flaky", "done")]
+    with Session(engine) as session:
+        worker.run_batch(session)
+        left = session.exec(select(Job).where(Job.kind == "test_flaky")).all()
+    # Nothing was committed: the jobs stay claimed, for the other worker to finish
+    assert len(left) == 3
+    assert {job.status for job in left} == {JobStatus.RUNNING}
+    assert worker.processed[("test_flaky", "done")] == processed
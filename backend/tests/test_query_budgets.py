@@ -0,0 +1,102 @@
+"""Every list and detail endpoint stays within its declared query budget.
+
+QUERY_BUDGET_ENFORCE is on (see conftest.py), so an endpoint that issues more
+statements than its `query_budget(n)`, e.g. through a lazy load per row,
+raises QueryBudgetExceeded and fails the test instead of logging a warning.
+"""
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select, func
+from app.auth import create_access_token
+from app.database import engine
+from app.models import User, ServiceProvider, Booking
+from app.querybudget import query_budget, QueryBudgetExceeded
+
+def auth(email: str) -> dict:
+    # Minted directly, so fixtures do not pay for bcrypt
+    return {"Authorization": "Bearer " + create_access_token({"sub": email})}
+
+@pytest.fixture(scope="module")
+def accounts(client):
+    with Session(engine) as session:
+        busiest = lambda column: session.exec(
+            select(column).group_by(column).order_by(func.count().desc()).limit(1)
+        ).one()
+        provider = session.get(ServiceProvider, busiest(Booking.provider_id))
+        customer = session.get(User, busiest(Booking.user_id))
+        return {
+            "provider_id": provider.id,
+            "pincode": provider.location_pincode,
+            "provider": auth(session.get(User, provider.user_id).email),
+            "customer": auth(customer.email),
+            "admin": auth("admin@example.com"),
+        }
+
+def get_pages(client, path, headers=None, pages=2, **params):
+    # The first pages of a paginated endpoint, following next_cursor
+    bodies = []
+    for _ in range(pages):
+        response = client.get(path, headers=headers, params=params)
+        assert response.status_code == 200, response.text
+        bodies.append(response.json())
+        if not bodies[-1]["next_cursor"]:
+            break
+        params = {**params, "cursor": bodies[-1]["next_cursor"]}
+    return bodies
+
+def test_budget_is_enforced():
+    app = FastAPI()
+
+    @app.get("/", dependencies=[Depends(query_budget(1))])
+    def two_queries():
+        with Session(engine) as session:
+            session.exec(select(1)).one()
+            session.exec(select(2)).one()
+
+    with pytest.raises(QueryBudgetExceeded):
+        TestClient(app).get("/")
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"sort_by": "score"},
+    {"sort_by": "experience", "include_total": True},
+    {"sort_by": "none"},
+    {"category": "Plumber"},
+    {"categories": ["Plumber", "Electrician"], "match": "any"},
+    {"q": "plumber leak"},
+    {"radius_km": 10},
+    {"verified_only": False, "limit": 100},
+])
+def test_provider_search(client, accounts, params):
+    if "radius_km" in params:
+        params = {**params, "pincode": accounts["pincode"]}
+    pages = get_pages(client, "/providers/", **params)
+    assert pages[0]["items"]
+
+def test_provider_detail_and_reviews(client, accounts):
+    provider_id = accounts["provider_id"]
+    assert client.get(f"/providers/{provider_id}").status_code == 200
+    assert client.get(f"/reviews/provider/{provider_id}").status_code == 200
+    response = client.get(f"/providers/{provider_id}/availability",
+                          params={"start_date": "2025-01-06", "end_date": "2025-01-20"})
+    assert response.status_code == 200
+    assert client.get("/providers/me", headers=accounts["provider"]).status_code == 200
+
+@pytest.mark.parametrize("role", ["customer", "provider"])
+@pytest.mark.parametrize("params", [
+    {"limit": 10},
+    {"limit": 10, "include_total": True},
+    {"status": "completed", "start_date": "2024-10-01", "end_date": "2025-01-01"},
+])
+def test_booking_history(client, accounts, role, params):
+    pages = get_pages(client, "/bookings/my-bookings", headers=accounts[role], **params)
+    assert pages[0]["items"]
+    summary = client.get("/bookings/summary", headers=accounts[role])
+    assert summary.status_code == 200
+    assert summary.json()["total"] >= len(pages[0]["items"])
+
+@pytest.mark.parametrize("params", [{}, {"include_total": True, "limit": 5}])
+def test_admin_unverified_providers(client, accounts, params):
+    pages = get_pages(client, "/admin/unverified-providers", headers=accounts["admin"], **params)
+    assert pages[0]["items"]
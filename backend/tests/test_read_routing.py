@@ -0,0 +1,60 @@
+"""Reads go to the replica, but what it returns is never cached for everyone."""
+import pytest
+from sqlmodel import Session, select
+from app import database
+from app.auth import create_access_token
+from app.database import engine, async_engine, session_routes
+from app.models import User, UserRole, ServiceProvider
+from app.responsecache import response_cache
+
+def auth(email: str) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"sub": email})}
+
+@pytest.fixture
+def replica(client, monkeypatch):
+    # The primary standing in for a replica: routing only looks at which engine a session is on
+    monkeypatch.setattr(database, "read_engine", async_engine)
+    monkeypatch.setattr(database, "_replica_down_until", 0.0)
+    monkeypatch.setattr(response_cache, "max_bytes", 16 * 1024 * 1024)
+    database.recent_writers.clear()
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+@pytest.fixture(scope="module")
+def accounts(client):
+    with Session(engine) as session:
+        provider_id = session.exec(
+            select(ServiceProvider.id).where(ServiceProvider.verified == True).order_by(ServiceProvider.id.desc())
+        ).first()
+        customer = session.exec(select(User.email).where(User.role == UserRole.CUSTOMER).order_by(User.id.desc())).first()
+    return {"provider_id": provider_id, "customer": auth(customer), "admin": auth("admin@example.com")}
+
+def test_replica_reads_are_not_stored(client, replica, accounts):
+    path = f"/providers/{accounts['provider_id']}"
+    replica_reads = session_routes["replica"]
+    first = client.get(path)
+    assert first.headers["x-cache"] == "BYPASS"
+    assert client.get(path).headers["x-cache"] == "BYPASS"
+    assert session_routes["replica"] == replica_reads + 2
+    assert response_cache.stats()["entries"] == 0
+    # Clients can still revalidate
+    assert client.get(path, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+def test_recent_writer_reads_primary(client, replica, accounts):
+    path = f"/providers/{accounts['provider_id']}"
+    response = client.post("/bookings/", headers=accounts["customer"], json={
+        "provider_id": accounts["provider_id"], "date_time": "2030-05-07T10:00:00",
+    })
+    assert response.status_code == 200, response.text
+    assert client.get(path, headers=accounts["customer"]).headers["x-cache"] == "MISS"
+    assert client.get(path).headers["x-cache"] == "HIT"
+
+def test_export_falls_back_to_primary(client, replica, monkeypatch, accounts):
+    monkeypatch.setattr(database, "_replica_down_until", float("inf"))
+    fallbacks = session_routes["fallback"]
+    response = client.get("/admin/export/providers", headers=accounts["admin"], params={"format": "ndjson"})
+    assert response.status_code == 200
+    assert response.text.count("\n") > 1
+    # The admin lookup and the export's own session
+    assert session_routes["fallback"] == fallbacks + 2
@@ -0,0 +1,86 @@
+"""Cached public reads revalidate with ETags and drop out when the data behind them changes."""
+import pytest
+from sqlmodel import Session, select
+from app.auth import create_access_token
+from app.database import engine
+from app.jobs import worker
+from app.models import User, ServiceProvider, Booking, BookingStatus, Review
+from app.responsecache import response_cache
+
+def auth(email: str) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"sub": email})}
+
+@pytest.fixture
+def cache(client, monkeypatch):
+    # Storing is off for the rest of the suite (see conftest.py)
+    monkeypatch.setattr(response_cache, "max_bytes", 16 * 1024 * 1024)
+    response_cache.clear()
+    yield response_cache
+    response_cache.clear()
+
+@pytest.fixture(scope="module")
+def reviewable(client):
+    # A completed, unreviewed booking of a listed provider, and its customer
+    with Session(engine) as session:
+        booking_id, provider_id, email = session.exec(
+            select(Booking.id, Booking.provider_id, User.email)
+            .join(User, User.id == Booking.user_id)
+            .join(ServiceProvider, ServiceProvider.id == Booking.provider_id)
+            .outerjoin(Review, Review.booking_id == Booking.id)
+            .where(Booking.status == BookingStatus.COMPLETED, Review.id == None, ServiceProvider.verified == True)
+            .order_by(Booking.id)
+        ).first()
+    return {"booking_id": booking_id, "provider_id": provider_id, "customer": auth(email)}
+
+def run_jobs():
+    with Session(engine) as session:
+        while worker.run_batch(session):
+            pass
+
+def test_etag_revalidation(client, cache, reviewable):
+    path = f"/providers/{reviewable['provider_id']}"
+    first = client.get(path)
+    assert first.headers["x-cache"] == "MISS"
+    second = client.get(path)
+    assert second.headers["x-cache"] == "HIT"
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.content == first.content
+
+    not_modified = client.get(path, headers={"If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert client.get(path, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+def test_booking_invalidates_only_its_provider(client, cache, reviewable):
+    provider_id = reviewable["provider_id"]
+    for path in (f"/providers/{provider_id}", "/providers/"):
+        assert client.get(path).headers["x-cache"] == "MISS"
+    response = client.post("/bookings/", headers=reviewable["customer"], json={
+        "provider_id": provider_id, "date_time": "2030-04-02T10:00:00",
+    })
+    assert response.status_code == 200, response.text
+    assert client.get(f"/providers/{provider_id}").headers["x-cache"] == "MISS"
+    # List pages pick up the new score within the TTL
+    assert client.get("/providers/").headers["x-cache"] == "HIT"
+
+def test_review_invalidates_reviews_then_provider(client, cache, reviewable):
+    provider_id = reviewable["provider_id"]
+    reviews_path, provider_path = f"/reviews/provider/{provider_id}", f"/providers/{provider_id}"
+    client.get(provider_path)
+    client.get(reviews_path)
+    response = client.post("/reviews/", headers=reviewable["customer"], json={
+        "booking_id": reviewable["booking_id"], "rating": 5, "comment": "Cache test review",
+    })
+    assert response.status_code == 200, response.text
+
+    reviews = client.get(reviews_path)
+    assert reviews.headers["x-cache"] == "MISS"
+    assert any(review["comment"] == "Cache test review" for review in reviews.json())
+    # The rating is the job worker's to update, and invalidate
+    assert client.get(provider_path).headers["x-cache"] == "HIT"
+    with Session(engine) as session:
+        rating_count = session.get(ServiceProvider, provider_id).rating_count
+    run_jobs()
+    assert client.get(provider_path).headers["x-cache"] == "MISS"
+    with Session(engine) as session:
+        assert session.get(ServiceProvider, provider_id).rating_count == rating_count + 1
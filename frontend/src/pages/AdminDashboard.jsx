@@ -4,6 +4,9 @@ import { ShieldCheck, UserCheck, BarChart3, AlertTriangle, Check, X } from 'luci
 
 const AdminDashboard = () => {
   const [unverifiedProviders, setUnverifiedProviders] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [pendingTotal, setPendingTotal] = useState(0);
+  const [selected, setSelected] = useState([]);
   const [analytics, setAnalytics] = useState(null);
   const [loading, setLoading] = useState(true);
 
@@ -14,10 +17,13 @@ const AdminDashboard = () => {
   const fetchData = async () => {
     try {
       const [uRes, aRes] = await Promise.all([
-        api.get('/admin/unverified-providers'),
+        api.get('/admin/unverified-providers', { params: { include_total: true } }),
         api.get('/admin/analytics')
       ]);
-      setUnverifiedProviders(uRes.data);
+      setUnverifiedProviders(uRes.data.items);
+      setNextCursor(uRes.data.next_cursor);
+      setPendingTotal(uRes.data.total);
+      setSelected([]);
       setAnalytics(aRes.data);
     } catch (err) {
       console.error(err);
@@ -26,6 +32,16 @@ const AdminDashboard = () => {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      const res = await api.get('/admin/unverified-providers', { params: { cursor: nextCursor } });
+      setUnverifiedProviders((prev) => [...prev, ...res.data.items]);
+      setNextCursor(res.data.next_cursor);
+    } catch (err) {
+      console.error(err);
+    }
+  };
+
   const handleVerify = async (id, approve) => {
     try {
       await api.post(`/admin/verify-provider/${id}?approve=${approve}`);
@@ -35,6 +51,19 @@ const AdminDashboard = () => {
     }
   };
 
+  const toggleSelected = (id) => {
+    setSelected((prev) => prev.includes(id) ? prev.filter((x) => x !== id) : [...prev, id]);
+  };
+
+  const handleBulkVerify = async (approve) => {
+    try {
+      await api.post('/admin/verify-providers', { approve, provider_ids: selected });
+      fetchData();
+    } catch (err) {
+      alert("Action failed");
+    }
+  };
+
   if (loading) return <div className="p-10 text-center">Loading...</div>;
 
   return (
@@ -48,15 +77,42 @@ const AdminDashboard = () => {
           <div className="bg-white rounded-xl shadow-sm border border-gray-100 p-8">
             <h2 className="text-xl font-bold mb-6 flex items-center">
               <UserCheck size={20} className="mr-2 text-blue-600" /> Pending Verifications
+              {pendingTotal > 0 && <span className="ml-2 text-sm font-normal text-gray-400">({pendingTotal})</span>}
             </h2>
 
+            {selected.length > 0 && (
+              <div className="flex items-center justify-between mb-4 p-3 bg-blue-50 rounded-lg text-sm">
+                <span className="text-blue-800 font-medium">{selected.length} selected</span>
+                <div className="flex gap-2">
+                  <button
+                    onClick={() => handleBulkVerify(true)}
+                    className="bg-green-600 text-white px-3 py-1 rounded-md font-bold hover:bg-green-700"
+                  >
+                    Approve selected
+                  </button>
+                  <button
+                    onClick={() => handleBulkVerify(false)}
+                    className="bg-red-600 text-white px-3 py-1 rounded-md font-bold hover:bg-red-700"
+                  >
+                    Reject selected
+                  </button>
+                </div>
+              </div>
+            )}
+
             {unverifiedProviders.length === 0 ? (
               <p className="text-gray-500 italic">No pending verifications at this time.</p>
             ) : (
               <div className="space-y-4">
                 {unverifiedProviders.map((p) => (
                   <div key={p.id} className="flex items-center justify-between p-4 bg-gray-50 rounded-lg border border-gray-100">
-                    <div>
+                    <input
+                      type="checkbox"
+                      checked={selected.includes(p.id)}
+                      onChange={() => toggleSelected(p.id)}
+                      className="mr-4"
+                    />
+                    <div className="flex-1">
                       <h4 className="font-bold text-gray-900">{p.user.name}</h4>
                       <p className="text-sm text-blue-600">{p.services} • {p.experience}y exp</p>
                       <p className="text-xs text-gray-400 mt-1">Contact: {p.contact_info} • Pincode: {p.location_pincode}</p>
@@ -77,6 +133,11 @@ const AdminDashboard = () => {
                     </div>
                   </div>
                 ))}
+                {nextCursor && (
+                  <button onClick={loadMore} className="w-full py-2 text-sm font-bold text-blue-600 hover:text-blue-800">
+                    Load more
+                  </button>
+                )}
               </div>
             )}
           </div>
@@ -95,7 +156,7 @@ const AdminDashboard = () => {
                   <div className="space-y-2">
                     {analytics.top_services.map((s, i) => (
                       <div key={i} className="flex justify-between items-center text-sm">
-                        <span className="text-gray-700">{s.services}</span>
+                        <span className="text-gray-700">{s.category}</span>
                         <span className="bg-blue-100 text-blue-700 px-2 py-0.5 rounded font-bold">{s.count}</span>
                       </div>
                     ))}
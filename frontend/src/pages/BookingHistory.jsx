@@ -5,16 +5,27 @@ import { Calendar, Clock, User, CheckCircle, XCircle, Star } from 'lucide-react'
 
 const BookingHistory = () => {
   const [bookings, setBookings] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [summary, setSummary] = useState(null);
+  const [filters, setFilters] = useState({ status: '', start_date: '', end_date: '' });
   const [loading, setLoading] = useState(true);
   const { user } = useAuth();
   const [reviewModal, setReviewModal] = useState({ show: false, bookingId: null });
   const [rating, setRating] = useState(5);
   const [comment, setComment] = useState('');
 
+  // Empty filters are left out of the query string
+  const filterParams = () => Object.fromEntries(Object.entries(filters).filter(([, value]) => value));
+
   const fetchBookings = async () => {
     try {
-      const response = await api.get('/bookings/my-bookings');
-      setBookings(response.data);
+      const [response, summaryRes] = await Promise.all([
+        api.get('/bookings/my-bookings', { params: filterParams() }),
+        api.get('/bookings/summary')
+      ]);
+      setBookings(response.data.items);
+      setNextCursor(response.data.next_cursor);
+      setSummary(summaryRes.data);
     } catch (error) {
       console.error("Error fetching bookings", error);
     } finally {
@@ -22,9 +33,19 @@ const BookingHistory = () => {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      const response = await api.get('/bookings/my-bookings', { params: { ...filterParams(), cursor: nextCursor } });
+      setBookings((prev) => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error("Error fetching bookings", error);
+    }
+  };
+
   useEffect(() => {
     fetchBookings();
-  }, []);
+  }, [filters]);
 
   const updateStatus = async (id, status) => {
     try {
@@ -59,9 +80,48 @@ const BookingHistory = () => {
         <Calendar className="mr-3 text-blue-600" /> Booking History
       </h1>
 
+      {summary && (
+        <div className="flex flex-wrap gap-3 mb-6">
+          {[['', 'All', summary.total], ...Object.entries(summary.counts).map(([status, count]) => [status, status, count])].map(([status, label, count]) => (
+            <button
+              key={label}
+              onClick={() => setFilters({ ...filters, status })}
+              className={`px-4 py-2 rounded-full text-sm font-bold capitalize ${
+                filters.status === status ? 'bg-blue-600 text-white' : 'bg-white text-gray-700 border border-gray-200 hover:bg-gray-50'
+              }`}
+            >
+              {label} ({count})
+            </button>
+          ))}
+        </div>
+      )}
+
+      <div className="flex flex-wrap items-center gap-3 mb-8 text-sm text-gray-600">
+        <label className="flex items-center gap-2">
+          From
+          <input
+            type="date"
+            className="border rounded-md p-2"
+            value={filters.start_date}
+            onChange={(e) => setFilters({ ...filters, start_date: e.target.value })}
+          />
+        </label>
+        <label className="flex items-center gap-2">
+          Before
+          <input
+            type="date"
+            className="border rounded-md p-2"
+            value={filters.end_date}
+            onChange={(e) => setFilters({ ...filters, end_date: e.target.value })}
+          />
+        </label>
+      </div>
+
       {bookings.length === 0 ? (
         <div className="bg-white p-10 rounded-lg shadow-sm text-center">
-          <p className="text-gray-500">You don't have any bookings yet.</p>
+          <p className="text-gray-500">
+            {summary?.total ? 'No bookings match these filters.' : "You don't have any bookings yet."}
+          </p>
         </div>
       ) : (
         <div className="space-y-4">
@@ -128,6 +188,11 @@ const BookingHistory = () => {
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <button onClick={loadMore} className="w-full py-3 text-sm font-bold text-blue-600 hover:text-blue-800">
+              Load more
+            </button>
+          )}
         </div>
       )}
 
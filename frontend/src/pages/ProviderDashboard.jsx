@@ -7,23 +7,26 @@ import { Briefcase, Calendar, Star, CheckCircle, Clock } from 'lucide-react';
 const ProviderDashboard = () => {
   const { user } = useAuth();
   const [provider, setProvider] = useState(null);
-  const [stats, setStats] = useState({ bookings: 0, rating: 0 });
+  const [stats, setStats] = useState({ bookings: 0, pending: 0, rating: 0 });
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     const fetchProviderData = async () => {
       try {
-        const res = await api.get('/bookings/my-bookings');
-        const bks = res.data;
+        // Counts only; the booking rows are paged in on the history page
+        const res = await api.get('/bookings/summary');
 
-        // Find provider profile
-        // In a real app we'd have an endpoint /providers/me
-        const pRes = await api.get('/providers/');
-        const myP = pRes.data.find(p => p.user_id === user.id);
+        // 404 until the provider profile has been created
+        const pRes = await api.get('/providers/me').catch((err) => {
+          if (err.response?.status === 404) return { data: null };
+          throw err;
+        });
+        const myP = pRes.data;
 
         setProvider(myP);
         setStats({
-          bookings: bks.length,
+          bookings: res.data.total,
+          pending: res.data.counts.pending,
           rating: myP?.rating_avg || 0
         });
       } catch (err) {
@@ -74,7 +77,7 @@ const ProviderDashboard = () => {
             <Clock size={20} className="mr-2 text-blue-600" /> Recent Activity
           </h3>
           <Link to="/bookings" className="block text-center py-4 text-blue-600 hover:bg-blue-50 rounded-lg border border-dashed border-blue-200 transition">
-            View All Booking Requests
+            {stats.pending ? `${stats.pending} Pending · ` : ''}View All Booking Requests
           </Link>
         </div>
 
@@ -5,20 +5,33 @@ import { Search, MapPin, Star, Filter } from 'lucide-react';
 
 const ProviderSearch = () => {
   const [providers, setProviders] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  // Filters of the last search, so "Load more" ignores unsubmitted edits
+  const [searchedParams, setSearchedParams] = useState({});
   const [loading, setLoading] = useState(true);
   const location = useLocation();
   const queryParams = new URLSearchParams(location.search);
 
   const [filters, setFilters] = useState({
+    q: queryParams.get('q') || '',
     category: queryParams.get('category') || '',
     pincode: queryParams.get('pincode') || '',
   });
 
+  // Leave out blank filters
+  const searchParams = () => ({
+    sort_by: 'score',
+    ...Object.fromEntries(Object.entries(filters).filter(([, value]) => value.trim() !== ''))
+  });
+
   const fetchProviders = async () => {
     setLoading(true);
     try {
-      const response = await api.get('/providers/', { params: filters });
-      setProviders(response.data);
+      const params = searchParams();
+      const response = await api.get('/providers/', { params });
+      setSearchedParams(params);
+      setProviders(response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error("Error fetching providers", error);
     } finally {
@@ -26,6 +39,16 @@ const ProviderSearch = () => {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      const response = await api.get('/providers/', { params: { ...searchedParams, cursor: nextCursor } });
+      setProviders((prev) => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error("Error fetching providers", error);
+    }
+  };
+
   useEffect(() => {
     fetchProviders();
   }, []);
@@ -43,6 +66,13 @@ const ProviderSearch = () => {
         </h1>
 
         <form onSubmit={handleSearch} className="flex flex-wrap gap-2">
+          <input
+            type="text"
+            placeholder="e.g. leaking kitchen tap"
+            className="border rounded-md px-3 py-2"
+            value={filters.q}
+            onChange={(e) => setFilters({...filters, q: e.target.value})}
+          />
           <select
             className="border rounded-md px-3 py-2 bg-white"
             value={filters.category}
@@ -105,6 +135,14 @@ const ProviderSearch = () => {
               </div>
             </Link>
           ))}
+          {nextCursor && (
+            <button
+              onClick={loadMore}
+              className="col-span-full py-3 text-sm font-bold text-blue-600 hover:text-blue-800"
+            >
+              Load more
+            </button>
+          )}
         </div>
       )}
     </div>